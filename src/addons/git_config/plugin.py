@@ -10,6 +10,7 @@ from src.core.utils import logger
 class GitAddon(BaseAddon):
     SSH_KEY_NAME = "id_ed25519"
     SSH_SYSTEM_DIR = Path("/root/.ssh")
+    SSH_BACKUP_DIR = Path("/root/.ssh.bak")
     module_dir = "git_config"
 
     def _get_ssh_persistent_dir(self, ctx: AppContext) -> Path:
@@ -73,18 +74,21 @@ class GitAddon(BaseAddon):
         self._link_ssh_to_system(ctx)
 
     def _inject_key_from_env(self, ctx: AppContext, private_path: Path, public_path: Path) -> bool:
-        """从 manifest/环境变量注入 SSH 密钥 (Base64 编码)"""
+        """从 manifest/环境变量注入 SSH 密钥 (PEM 原文或 Base64 编码)"""
         manifest = self.get_manifest(ctx)
-        private_key_b64 = (manifest.get("ssh_private_key") or os.getenv("GIT_SSH_PRIVATE_KEY", "")).strip()
+        private_key_raw = (manifest.get("ssh_private_key") or os.getenv("GIT_SSH_PRIVATE_KEY", "")).strip()
         public_key = (manifest.get("ssh_public_key") or os.getenv("GIT_SSH_PUBLIC_KEY", "")).strip()
 
-        if not private_key_b64:
+        if not private_key_raw:
             return False
 
         try:
-            private_key = base64.b64decode(private_key_b64).decode("utf-8")
-            private_path.write_text(private_key)
-            private_path.chmod(0o600)
+            if private_key_raw.startswith("-----BEGIN"):
+                # PEM 原文直接写入（ssh 要求私钥以换行结尾）
+                private_key = private_key_raw + "\n"
+            else:
+                private_key = base64.b64decode(private_key_raw).decode("utf-8")
+            self._write_private_key(private_path, private_key)
 
             if public_key:
                 public_path.write_text(public_key + "\n")
@@ -97,6 +101,16 @@ class GitAddon(BaseAddon):
             logger.warning(f"  -> [WARN] 环境变量密钥注入失败: {e}")
             return False
 
+    @staticmethod
+    def _write_private_key(path: Path, content: str) -> None:
+        """以 0600 权限写入私钥，避免先写后 chmod 期间的权限窗口"""
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            # 文件已存在时 os.open 不会修改权限，这里统一收紧（Windows 无 fchmod）
+            if hasattr(os, "fchmod"):
+                os.fchmod(f.fileno(), 0o600)
+            f.write(content)
+
     def _extract_public_key(self, ctx: AppContext, private_path: Path, public_path: Path) -> None:
         """从私钥提取公钥"""
         try:
@@ -130,9 +144,9 @@ class GitAddon(BaseAddon):
             self.SSH_SYSTEM_DIR.unlink()
 
         if self.SSH_SYSTEM_DIR.exists():
-            backup_dir = Path("/root/.ssh.bak")
-            if backup_dir.exists():
-                shutil.rmtree(backup_dir)
+            backup_dir = self.SSH_BACKUP_DIR
+            # 旧备份不存在时直接忽略，省去一次 exists() 探测
+            shutil.rmtree(backup_dir, ignore_errors=True)
             self.SSH_SYSTEM_DIR.rename(backup_dir)
             logger.info(f"  -> 已备份原有 .ssh 目录到 {backup_dir}")
 
@@ -9,15 +9,20 @@ Lock 文件管理
   /root/ComfyUI/models/ → 软链接 → /root/autodl-tmp/models/
   扫描的是 /root/autodl-tmp/models/ (实际存储位置)
 """
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, FrozenSet, Iterator, List, Optional, Tuple
 
-from src.lib.utils import load_yaml, save_yaml, sha256
+import yaml
+
+from src.lib.utils import load_yaml_stream, sha256
 from src.core.utils import logger
 
 # 排除的文件扩展名（非模型文件）
-EXCLUDED_EXTENSIONS = {
+EXCLUDED_EXTENSIONS: FrozenSet[str] = frozenset({
     ".yaml", ".yml", ".json", ".txt", ".md", ".log",
     ".py", ".sh", ".bat", ".ps1",
     ".jpg", ".jpeg", ".png", ".gif", ".bmp", ".svg", ".webp",
@@ -25,11 +30,25 @@ EXCLUDED_EXTENSIONS = {
     ".zip", ".tar", ".gz", ".bz2", ".7z", ".rar",
     ".lock", ".metadata",  # 下载缓存的锁文件和元数据
     ".meta",  # sidecar 元数据文件
-}
+})
 
 # Meta sidecar 后缀
 META_SUFFIX = ".meta"
 
+# hash 类型：全量 SHA256 / 大文件首尾指纹（仅用于变更检测，不可用于完整性校验）
+HASH_TYPE_FULL = "SHA256"
+HASH_TYPE_HEAD_TAIL = "SHA256-HEAD-TAIL"
+
+# 超过该大小的文件只计算首尾指纹（默认 None: 始终全量 SHA256，
+# 可通过 models/manifest.yaml 的 full_hash_max_size 开启）
+FULL_HASH_MAX_SIZE: Optional[int] = None
+
+# 首尾指纹各读取的字节数
+_HEAD_TAIL_CHUNK = 1 << 20
+
+# Windows 无 O_CLOEXEC
+_O_CLOEXEC = getattr(os, "O_CLOEXEC", 0)
+
 
 def _meta_path_for(model_path: Path) -> Path:
     """获取模型文件对应的 .meta sidecar 路径
@@ -39,22 +58,108 @@ def _meta_path_for(model_path: Path) -> Path:
     return model_path.parent / f".{model_path.name}{META_SUFFIX}"
 
 
+def _load_meta_file(meta_path: str) -> Dict[str, Any]:
+    """直接 open 读取 sidecar，不存在时由 ENOENT 快速返回空字典（不做 exists() 探测）
+
+    解析走 load_yaml_stream，与 load_yaml 一样优先使用 libyaml 的 CSafeLoader。
+    """
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return load_yaml_stream(f)
+    except FileNotFoundError:
+        return {}
+
+
 def read_meta(model_path: Path) -> Dict[str, Any]:
     """读取模型文件对应的 .meta sidecar
 
     Returns:
         meta 数据字典，不存在则返回空字典
     """
-    meta_file = _meta_path_for(model_path)
-    if meta_file.exists():
-        return load_yaml(meta_file)
-    return {}
+    return _load_meta_file(str(_meta_path_for(model_path)))
 
 
 def write_meta(model_path: Path, meta: Dict[str, Any]) -> None:
-    """写入模型文件对应的 .meta sidecar"""
+    """写入模型文件对应的 .meta sidecar
+
+    先一次性序列化为 bytes，写入同目录临时文件后 os.replace，
+    不经过 TextIOWrapper/BufferedWriter，中途崩溃也不会留下半截 sidecar。
+    """
     meta_file = _meta_path_for(model_path)
-    save_yaml(meta_file, meta)
+    data = yaml.dump(
+        meta, default_flow_style=False, allow_unicode=True, sort_keys=False,
+    ).encode("utf-8")
+    # 临时文件同样以 . 开头，扫描与孤儿清理均不会误认
+    tmp_path = meta_file.with_name(f"{meta_file.name}.tmp")
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | _O_CLOEXEC, 0o644)
+    try:
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+        os.replace(tmp_path, meta_file)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def _scandir_tree(
+    models_base: Path,
+    skip_hidden_dirs: bool = True,
+) -> Iterator[Tuple[str, Optional[str], List[os.DirEntry]]]:
+    """逐目录 scandir 遍历，每个目录只列举一次
+
+    软链接目录不递归（与 rglob 一致）。
+
+    Yields:
+        (相对路径前缀 如 "unet/sub/", 第一层子目录名或 None, 该目录的 DirEntry 列表)
+    """
+    # 栈元素: (目录绝对路径, 相对路径前缀, type)
+    stack: List[Tuple[str, str, Optional[str]]] = [(str(models_base), "", None)]
+    while stack:
+        dir_path, prefix, model_type = stack.pop()
+        try:
+            with os.scandir(dir_path) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        yield prefix, model_type, entries
+        for dir_entry in entries:
+            name = dir_entry.name
+            if skip_hidden_dirs and name.startswith("."):
+                continue
+            if dir_entry.is_dir(follow_symlinks=False):
+                # type = 第一层子目录名
+                stack.append((dir_entry.path, f"{prefix}{name}/", model_type or name))
+
+
+def _walk_model_files(
+    models_base: Path,
+) -> Iterator[Tuple[str, Optional[str], os.DirEntry, Optional[str]]]:
+    """遍历 models_base 下的非隐藏文件
+
+    文件类型判断复用 DirEntry 缓存，隐藏目录 (如 .cache/) 不会进入。
+    同目录的 .meta sidecar 在同一次列举中收集，无需逐文件探测。
+
+    Yields:
+        (相对路径 posix 形式, 第一层子目录名或 None, DirEntry, sidecar 路径或 None)
+    """
+    for prefix, model_type, entries in _scandir_tree(models_base):
+        # .flux.safetensors.meta -> flux.safetensors
+        metas = {
+            e.name[1:-len(META_SUFFIX)]: e.path
+            for e in entries
+            if e.name.startswith(".") and e.name.endswith(META_SUFFIX)
+        }
+        for dir_entry in entries:
+            name = dir_entry.name
+            # 跳过隐藏文件 (如 .meta sidecar)
+            if name.startswith("."):
+                continue
+            if not dir_entry.is_dir(follow_symlinks=False) and dir_entry.is_file():
+                yield f"{prefix}{name}", model_type, dir_entry, metas.get(name)
 
 
 def scan_models(models_base: Path) -> List[Dict[str, Any]]:
@@ -73,45 +178,34 @@ def scan_models(models_base: Path) -> List[Dict[str, Any]]:
     if not models_base.exists():
         return results
 
-    for model_file in sorted(models_base.rglob("*")):
-        if not model_file.is_file():
-            continue
-        # 跳过隐藏文件 (如 .meta sidecar)
-        if model_file.name.startswith("."):
-            continue
-        # 跳过隐藏目录下的文件 (如 .cache/)
-        rel_parts = model_file.relative_to(models_base).parts
-        if any(part.startswith(".") for part in rel_parts[:-1]):
-            continue
+    is_excluded = EXCLUDED_EXTENSIONS.__contains__
+    splitext = os.path.splitext
+    for rel_path, model_type, dir_entry, meta_path in _walk_model_files(models_base):
+        name = dir_entry.name
         # 跳过已知的非模型文件
-        if model_file.suffix.lower() in EXCLUDED_EXTENSIONS:
+        if is_excluded(splitext(name)[1].lower()):
+            continue
+        # 跳过 ComfyUI 占位文件 (put_*_here 命名模式)
+        if name.startswith("put_") and name.endswith("_here"):
             continue
 
-        # 使用 as_posix() 确保跨平台路径分隔符统一为 /
-        rel_path = model_file.relative_to(models_base).as_posix()
-        # type = 第一层子目录名
-        parts = rel_path.split("/")
-        model_type = parts[0] if len(parts) > 1 else None
-
-        stat = model_file.stat()
+        stat = dir_entry.stat()
 
         # 跳过 0 字节文件（通常是占位文件或损坏文件）
         if stat.st_size == 0:
             continue
 
-        # 跳过 ComfyUI 占位文件 (put_*_here 命名模式)
-        if model_file.name.startswith("put_") and model_file.name.endswith("_here"):
-            continue
-
         entry: Dict[str, Any] = {
             "path": rel_path,
             "size": stat.st_size,
             "mtime": stat.st_mtime,
+            "mtime_ns": stat.st_mtime_ns,
+            "ino": stat.st_ino,
             "type": model_type,
         }
 
-        # 合并 .meta sidecar 信息
-        meta = read_meta(model_file)
+        # 合并 .meta sidecar 信息（无 sidecar 的文件不产生任何 I/O）
+        meta = _load_meta_file(meta_path) if meta_path else {}
         if meta:
             if meta.get("url"):
                 entry["url"] = meta["url"]
@@ -122,12 +216,83 @@ def scan_models(models_base: Path) -> List[Dict[str, Any]]:
 
         results.append(entry)
 
+    # 与 Path 排序一致：按路径分段比较
+    results.sort(key=lambda e: e["path"].split("/"))
     return results
 
 
+def head_tail_fingerprint(file_path: Path) -> str:
+    """大文件指纹: SHA256(首 1 MiB || 尾 1 MiB || size)
+
+    只读取约 2 MiB 即可判断多 GB 模型文件是否变化。
+    """
+    h = hashlib.sha256()
+    fd = os.open(file_path, os.O_RDONLY | getattr(os, "O_BINARY", 0) | _O_CLOEXEC)
+    try:
+        size = os.fstat(fd).st_size
+        if hasattr(os, "pread"):
+            # pread 按偏移读取：单次系统调用，且不共享文件偏移，多线程安全
+            head = os.pread(fd, _HEAD_TAIL_CHUNK, 0)
+            tail = os.pread(fd, _HEAD_TAIL_CHUNK, max(0, size - _HEAD_TAIL_CHUNK))
+        else:
+            head = os.read(fd, _HEAD_TAIL_CHUNK)
+            os.lseek(fd, max(0, size - _HEAD_TAIL_CHUNK), os.SEEK_SET)
+            tail = os.read(fd, _HEAD_TAIL_CHUNK)
+    finally:
+        os.close(fd)
+    h.update(head)
+    h.update(tail)
+    h.update(size.to_bytes(8, "little"))
+    return h.hexdigest()
+
+
+def hash_type_for(size: int, full_hash_max_size: Optional[int] = FULL_HASH_MAX_SIZE) -> str:
+    """根据文件大小选择 hash 类型"""
+    if full_hash_max_size is not None and size > full_hash_max_size:
+        return HASH_TYPE_HEAD_TAIL
+    return HASH_TYPE_FULL
+
+
+_HASHERS = {
+    HASH_TYPE_FULL: sha256,
+    HASH_TYPE_HEAD_TAIL: head_tail_fingerprint,
+}
+
+
+def hash_files(paths: List[Path], hash_types: Optional[List[str]] = None) -> List[str]:
+    """并行计算多个文件的 hash，结果顺序与输入一致
+
+    hashlib 在大块数据上计算摘要时会释放 GIL，多线程可同时利用多核与磁盘带宽。
+
+    Args:
+        paths: 文件路径列表
+        hash_types: 与 paths 一一对应的 hash 类型，缺省全部为全量 SHA256
+    """
+    if hash_types is None:
+        hash_types = [HASH_TYPE_FULL] * len(paths)
+    jobs = [(_HASHERS[t], p) for t, p in zip(hash_types, paths)]
+    if len(jobs) <= 1:
+        return [fn(p) for fn, p in jobs]
+    workers = min(len(jobs), os.cpu_count() or 4)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda job: job[0](job[1]), jobs))
+
+
+def _prev_stat_key(m: Dict[str, Any]) -> Tuple[Any, ...]:
+    """上一次 lock 条目的 stat 指纹
+
+    新格式为 (size, mtime_ns, inode)，能识别同 size+mtime 的原地替换；
+    旧 lock 只有 _size/_mtime，退化为 (size, mtime)。
+    """
+    if "_mtime_ns" in m:
+        return (m.get("_size"), m["_mtime_ns"], m.get("_ino"))
+    return (m.get("_size"), m.get("_mtime"))
+
+
 def generate_snapshot(
     models_base: Path,
     previous_lock: Dict[str, Any],
+    full_hash_max_size: Optional[int] = FULL_HASH_MAX_SIZE,
 ) -> Dict[str, Any]:
     """生成模型目录快照
 
@@ -136,44 +301,56 @@ def generate_snapshot(
     Args:
         models_base: 模型根目录
         previous_lock: 上一次 lock 数据（用于增量 hash 判断）
+        full_hash_max_size: 超过该大小的文件记录 SHA256-HEAD-TAIL 指纹，None 表示始终全量 SHA256
 
     Returns:
         完整的 lock 数据字典
     """
-    # 构建上一次 lock 的索引: path -> entry
-    prev_index: Dict[str, Dict[str, Any]] = {}
+    # 构建上一次 lock 的索引: path -> (stat 指纹, hash 条目)，一次构建，逐文件 O(1) 查找
+    prev_index: Dict[str, Tuple[Tuple[Any, ...], Dict[str, Any]]] = {}
     for m in previous_lock.get("models", []):
         path = m.get("paths", [{}])[0].get("path", "")
         if path:
-            prev_index[path] = m
+            prev_hashes = m.get("hashes") or [{}]
+            prev_index[path] = (_prev_stat_key(m), prev_hashes[0])
 
     # 扫描当前文件
     scanned = scan_models(models_base)
 
-    models: List[Dict[str, Any]] = []
+    # 增量 hash: 如果上一次 lock 中有此文件且 stat 指纹未变，复用 hash
+    file_hashes: List[Optional[Dict[str, Any]]] = []
+    rehash: List[int] = []
     for item in scanned:
         rel_path = item["path"]
-        file_path = models_base / rel_path
-
-        # 增量 hash: 如果上一次 lock 中有此文件且 size+mtime 未变，复用 hash
         prev = prev_index.get(rel_path)
-        existing_hash: Optional[str] = None
-
-        if prev:
-            prev_hashes = prev.get("hashes", [])
-            if prev_hashes:
-                existing_hash = prev_hashes[0].get("hash")
-            # 检查是否需要重新计算
-            prev_size = prev.get("_size")
-            prev_mtime = prev.get("_mtime")
-            if prev_size == item["size"] and prev_mtime == item["mtime"] and existing_hash:
-                file_hash = existing_hash
-            else:
-                logger.info(f"  -> 计算 hash: {rel_path}")
-                file_hash = sha256(file_path)
-        else:
+        if prev is None:
             logger.info(f"  -> 计算 hash (新文件): {rel_path}")
-            file_hash = sha256(file_path)
+        else:
+            prev_key, prev_hash = prev
+            # 新旧两种指纹长度不同，只会命中与 lock 格式一致的那个
+            current_keys = (
+                (item["size"], item["mtime_ns"], item["ino"]),
+                (item["size"], item["mtime"]),
+            )
+            if prev_hash.get("hash") and prev_key in current_keys:
+                file_hashes.append({
+                    "hash": prev_hash["hash"],
+                    "type": prev_hash.get("type", HASH_TYPE_FULL),
+                })
+                continue
+            logger.info(f"  -> 计算 hash: {rel_path}")
+        rehash.append(len(file_hashes))
+        file_hashes.append(None)
+
+    hash_types = [hash_type_for(scanned[i]["size"], full_hash_max_size) for i in rehash]
+    computed = hash_files([models_base / scanned[i]["path"] for i in rehash], hash_types)
+    for i, hash_type, file_hash in zip(rehash, hash_types, computed):
+        file_hashes[i] = {"hash": file_hash, "type": hash_type}
+
+    models: List[Dict[str, Any]] = []
+    for item, hash_entry in zip(scanned, file_hashes):
+        rel_path = item["path"]
+        file_path = models_base / rel_path
 
         # 构造 lock entry (保持与原格式一致)
         entry: Dict[str, Any] = {}
@@ -186,7 +363,7 @@ def generate_snapshot(
             entry["url"] = item["url"]
 
         entry["paths"] = [{"path": rel_path}]
-        entry["hashes"] = [{"hash": file_hash, "type": "SHA256"}]
+        entry["hashes"] = [hash_entry]
 
         # type: 可选标签
         if item.get("type"):
@@ -195,6 +372,8 @@ def generate_snapshot(
         # 内部字段：用于下次增量判断 (以 _ 开头表示内部使用)
         entry["_size"] = item["size"]
         entry["_mtime"] = item["mtime"]
+        entry["_mtime_ns"] = item["mtime_ns"]
+        entry["_ino"] = item["ino"]
 
         models.append(entry)
 
@@ -207,8 +386,8 @@ def generate_snapshot(
 def cleanup_orphan_metas(models_base: Path) -> int:
     """清理孤儿 .meta 文件
 
-    扫描 models_base 下所有 .meta 文件，
-    如果对应的模型文件不存在，则删除该 .meta。
+    逐目录列举一次，用同目录的文件名集合判断 .meta 对应的模型是否存在，
+    不再对每个 .meta 单独 stat 模型文件。
 
     Returns:
         删除的孤儿 .meta 数量
@@ -218,24 +397,25 @@ def cleanup_orphan_metas(models_base: Path) -> int:
     if not models_base.exists():
         return cleaned
 
-    for meta_file in models_base.rglob(f".*{META_SUFFIX}"):
-        if not meta_file.is_file():
-            continue
-
-        # .flux.safetensors.meta -> flux.safetensors
-        model_name = meta_file.name[1:]  # 去掉开头的 .
-        if model_name.endswith(META_SUFFIX):
-            model_name = model_name[:-len(META_SUFFIX)]
-
-        model_file = meta_file.parent / model_name
-        if not model_file.exists():
+    # 与原 rglob 行为一致：隐藏目录下的 .meta 同样检查
+    for _, _, entries in _scandir_tree(models_base, skip_hidden_dirs=False):
+        # 悬空软链接视为不存在（与 Path.exists() 一致）
+        present = {
+            e.name for e in entries
+            if not e.is_symlink() or os.path.exists(e.path)
+        }
+        for e in entries:
+            name = e.name
+            if not (name.startswith(".") and name.endswith(META_SUFFIX)):
+                continue
+            # .flux.safetensors.meta -> flux.safetensors
+            if name[1:-len(META_SUFFIX)] in present or not e.is_file():
+                continue
             try:
-                meta_file.unlink()
-                logger.info(f"  -> 清理孤儿 meta: {meta_file.name}")
+                os.unlink(e.path)
+                logger.info(f"  -> 清理孤儿 meta: {name}")
                 cleaned += 1
             except OSError:
                 pass
 
     return cleaned
-
-
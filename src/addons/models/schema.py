@@ -48,4 +48,5 @@ class ModelPreset(BaseModel):
 
 class PresetsFile(BaseModel):
     """manifest.yaml 的顶层结构"""
+    full_hash_max_size: Optional[int] = None  # 首尾指纹阈值（字节），None 表示始终全量 SHA256
     presets: Dict[str, ModelPreset] = {}
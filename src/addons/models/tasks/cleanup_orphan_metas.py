@@ -6,6 +6,7 @@ CleanupOrphanMetas Task - 清理孤儿 .meta 文件
 from dataclasses import dataclass
 from pathlib import Path
 
+from src.addons.models.lock import cleanup_orphan_metas
 from src.core.interface import AppContext
 from src.core.task import BaseTask, TaskResult
 from src.core.utils import logger
@@ -32,30 +33,7 @@ class CleanupOrphanMetasTask(BaseTask):
         Returns:
             清理的文件数量
         """
-        cleaned = 0
-        
-        if not models_base.exists():
-            return cleaned
-        
-        for meta_file in models_base.rglob(f".*{self.META_SUFFIX}"):
-            if not meta_file.is_file():
-                continue
-            
-            # .flux.safetensors.meta -> flux.safetensors
-            model_name = meta_file.name[1:]  # 去掉开头的 .
-            if model_name.endswith(self.META_SUFFIX):
-                model_name = model_name[:-len(self.META_SUFFIX)]
-            
-            model_file = meta_file.parent / model_name
-            if not model_file.exists():
-                try:
-                    meta_file.unlink()
-                    logger.info(f"  -> 清理孤儿 meta: {meta_file.name}")
-                    cleaned += 1
-                except OSError:
-                    pass
-        
-        return cleaned
+        return cleanup_orphan_metas(models_base)
     
     def execute(self, ctx: AppContext) -> TaskResult:
         """执行清理"""
@@ -11,6 +11,36 @@ from src.core.interface import BaseAddon, AppContext, hookimpl
 from src.core.utils import logger
 
 
+# bin/ 全局命令脚本模板: (脚本名, 模板)，%(project_dir)s 在生成时替换
+_BIN_SCRIPTS = (
+    ("turbo", dedent("""\
+        #!/bin/bash
+        # AutoDL 网络环境初始化 - 自动生成，请勿手动修改
+        # 用法: source turbo
+        cd %(project_dir)s
+        eval $(python -m src.lib.network)
+    """)),
+    ("bye", dedent("""\
+        #!/bin/bash
+        # AutoDL 离线同步命令 - 自动生成，请勿手动修改
+        cd %(project_dir)s
+        python -m src.shutdown
+    """)),
+    ("model", dedent("""\
+        #!/bin/bash
+        # ComfyUI 模型管理命令 - 自动生成，请勿手动修改
+        cd %(project_dir)s
+        python -m src.addons.models.downloader "$@"
+    """)),
+    ("start", dedent("""\
+        #!/bin/bash
+        # ComfyUI 启动命令 - 自动生成，请勿手动修改
+        cd %(project_dir)s
+        python -m src.main start "$@"
+    """)),
+)
+
+
 class SystemAddon(BaseAddon):
     module_dir = "system"
 
@@ -19,10 +49,20 @@ class SystemAddon(BaseAddon):
         """执行环境初始化钩子"""
         logger.info("\n>>> [System] 开始执行基础设施装配...")
         ctx = context
+        # 整个 setup 只解析一次 home 目录
+        home = Path.home()
         
         self._install_system_tools(ctx)
-        self._install_uv(ctx)
-        self._generate_bin_scripts(ctx)
+        self._install_uv(ctx, home)
+        self._generate_bin_scripts(ctx, home)
+
+    @staticmethod
+    def _prepend_to_path(directory: Path) -> None:
+        """将目录移到当前进程 PATH 头部（按条目精确去重，已存在时也提前，保证优先级）"""
+        entry = str(directory)
+        path_env = os.environ.get("PATH", "")
+        rest = [p for p in path_env.split(os.pathsep) if p != entry] if path_env else []
+        os.environ["PATH"] = os.pathsep.join([entry, *rest])
 
     def _install_system_tools(self, ctx: AppContext) -> None:
         """任务 0: 安装必要的系统工具 (lsof, fuser 等)"""
@@ -40,9 +80,9 @@ class SystemAddon(BaseAddon):
         except Exception as e:
             logger.warning(f"  -> [WARN] 系统工具安装失败: {e}，端口清理功能可能受限")
 
-    def _install_uv(self, ctx: AppContext) -> None:
+    def _install_uv(self, ctx: AppContext, home: Path) -> None:
         """任务 2: 安装 uv 包管理器"""
-        uv_path = Path.home() / ".local" / "bin"
+        uv_path = home / ".local" / "bin"
         uv_bin = uv_path / "uv"
         
         if not uv_bin.exists():
@@ -55,66 +95,48 @@ class SystemAddon(BaseAddon):
         else:
             logger.info("  -> uv 已就绪。")
         
-        if str(uv_path) not in os.environ.get("PATH", ""):
-            os.environ["PATH"] = f"{uv_path}:{os.environ.get('PATH', '')}"
+        self._prepend_to_path(uv_path)
         
         # 产出：供后续插件使用
         ctx.artifacts.uv_bin = uv_bin
 
-    def _generate_bin_scripts(self, ctx: AppContext) -> None:
+    def _generate_bin_scripts(self, ctx: AppContext, home: Path) -> None:
         """任务 3: 生成 bin/ 全局命令脚本并配置 PATH"""
         project_dir = ctx.base_dir / "autodl-instance"
         bin_dir = project_dir / "bin"
         
         bin_dir.mkdir(parents=True, exist_ok=True)
         
-        scripts = {
-            "turbo": dedent(f"""\
-                #!/bin/bash
-                # AutoDL 网络环境初始化 - 自动生成，请勿手动修改
-                # 用法: source turbo
-                cd {project_dir}
-                eval $(python -m src.lib.network)
-            """),
-            "bye": dedent(f"""\
-                #!/bin/bash
-                # AutoDL 离线同步命令 - 自动生成，请勿手动修改
-                cd {project_dir}
-                python -m src.shutdown
-            """),
-            "model": dedent(f"""\
-                #!/bin/bash
-                # ComfyUI 模型管理命令 - 自动生成，请勿手动修改
-                cd {project_dir}
-                python -m src.addons.models.downloader "$@"
-            """),
-            "start": dedent(f"""\
-                #!/bin/bash
-                # ComfyUI 启动命令 - 自动生成，请勿手动修改
-                cd {project_dir}
-                python -m src.main start "$@"
-            """),
-        }
-        
-        for script_name, content in scripts.items():
+        for script_name, template in _BIN_SCRIPTS:
             script_path = bin_dir / script_name
-            script_path.write_text(content)
-            script_path.chmod(0o755)
+            script_path.write_bytes((template % {"project_dir": project_dir}).encode())
+            os.chmod(script_path, 0o755)
             logger.info(f"  -> 已生成命令脚本: {script_path}")
         
-        bashrc_path = Path.home() / ".bashrc"
+        bashrc_path = home / ".bashrc"
         path_export = f'export PATH="{bin_dir}:$PATH"'
         
-        if bashrc_path.exists():
-            bashrc_content = bashrc_path.read_text()
-            if str(bin_dir) not in bashrc_content:
-                with bashrc_path.open("a") as f:
-                    f.write(f"\n# AutoDL Instance 全局命令\n{path_export}\n")
+        try:
+            # 按字节做子串判定，无需解码整个 .bashrc
+            bashrc_content = bashrc_path.read_bytes()
+        except FileNotFoundError:
+            bashrc_content = None
+        if bashrc_content is not None:
+            if str(bin_dir).encode() not in bashrc_content:
+                line = f"\n# AutoDL Instance 全局命令\n{path_export}\n".encode()
+                fd = os.open(bashrc_path, os.O_WRONLY | os.O_APPEND)
+                try:
+                    # os.write 可能只写入部分字节，循环直到全部写完
+                    view = memoryview(line)
+                    while view:
+                        view = view[os.write(fd, view):]
+                finally:
+                    os.close(fd)
                 logger.info(f"  -> 已将 bin/ 目录加入 PATH")
             else:
                 logger.info(f"  -> PATH 配置已存在，跳过。")
         
-        os.environ["PATH"] = f"{bin_dir}:{os.environ.get('PATH', '')}"
+        self._prepend_to_path(bin_dir)
         
         # 产出
         ctx.artifacts.bin_dir = bin_dir
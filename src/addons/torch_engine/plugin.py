@@ -1,18 +1,48 @@
 """
 Torch Engine Addon - PyTorch CUDA 环境装配
 """
+import json
 import sys
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
 from src.core.interface import BaseAddon, AppContext, hookimpl
+from src.core.ports import CommandResult
 from src.core.task import BaseTask, TaskRunner
 from src.core.utils import logger
+from src.addons.torch_engine.probe import (
+    VERSION_RE,
+    TorchInfo,
+    parse_version,
+    probe_torch_cuda,
+    read_nvidia_driver_version,
+)
 from src.addons.torch_engine.tasks import FixCudaDependencyChainTask
 
 
+# 子进程探测脚本（就绪确认）: 一次 import torch 同时输出版本与 CUDA 信息
+_TORCH_PROBE_SCRIPT = (
+    "import json, sys\n"
+    "try:\n"
+    "    import torch\n"
+    "except Exception as e:\n"
+    '    print(f"EXCEPTION: {type(e).__name__}: {e}", file=sys.stderr)\n'
+    "    sys.exit(1)\n"
+    'print(json.dumps({"torch": str(torch.__version__), "cuda": torch.version.cuda}), end="")\n'
+)
+
+
 class TorchAddon(BaseAddon):
     module_dir = "torch_engine"
 
+    def __init__(self) -> None:
+        # Torch 探测结果缓存: (解释器路径, 探测脚本) -> CommandResult
+        # 每次探测都要冷启动解释器并 import torch，同一实例内重复 setup 直接复用
+        self._torch_info_cache: Dict[Tuple[str, str], CommandResult] = {}
+
+    def clear_cache(self) -> None:
+        """清空 Torch 探测缓存（安装/升级 Torch 后调用）"""
+        self._torch_info_cache.clear()
+
     # ── 任务声明 ──
     def get_tasks(self, phase: str) -> List[BaseTask]:
         """
@@ -32,47 +62,68 @@ class TorchAddon(BaseAddon):
         return []
 
     # ── 私有方法 ──
+    def _run_probe(self, ctx: AppContext, script: str) -> CommandResult:
+        """在当前解释器中执行探测脚本，结果按 (sys.executable, script) 缓存"""
+        key = (sys.executable, script)
+        result = self._torch_info_cache.get(key)
+        if result is None:
+            result = ctx.cmd.run([sys.executable, "-c", script], check=False)
+            self._torch_info_cache[key] = result
+        return result
+
+    def _probe_torch_import(self, ctx: AppContext) -> Optional[TorchInfo]:
+        """子进程中真实 import torch 获取版本信息（结果经 _run_probe 缓存）
+
+        Returns:
+            TorchInfo；未安装、安装残缺导致 import 失败或输出无法解析时返回 None
+        """
+        result = self._run_probe(ctx, _TORCH_PROBE_SCRIPT)
+        if result.returncode != 0:
+            logger.debug(f"  -> [DEBUG] Torch 子进程探测失败: {result.stderr.strip()}")
+            return None
+        try:
+            data = json.loads(result.stdout)
+            return TorchInfo(version=str(data["torch"]), cuda=data.get("cuda"))
+        except (ValueError, KeyError, TypeError):
+            logger.debug(f"  -> [DEBUG] Torch 探测输出无法解析: {result.stdout.strip()!r}")
+            return None
+
+    def _probe_torch(self, ctx: AppContext) -> Optional[TorchInfo]:
+        """获取已安装 Torch 的版本信息（仅用于展示）
+
+        优先进程内读取 version.py；失败时回退为单次子进程探测。
+
+        Returns:
+            TorchInfo；未安装或探测失败时返回 None
+        """
+        return probe_torch_cuda() or self._probe_torch_import(ctx)
+
     def _get_torch_cuda_info(self, ctx: AppContext) -> str:
         """获取当前 Torch 的版本和 CUDA 信息用于调试"""
-        check_script = (
-            "import sys\n"
-            "try:\n"
-            "    import torch\n"
-            "    cuda_ver = torch.version.cuda\n"
-            "    try:\n"
-            "        cuda_float = float(cuda_ver) if cuda_ver else None\n"
-            "    except:\n"
-            '        cuda_float = "parse_error"\n'
-            '    print(f"torch={torch.__version__}, cuda_raw={repr(cuda_ver)}, cuda_float={cuda_float}", end="")\n'
-            "except Exception as e:\n"
-            '    print(f"error={e}", end="")\n'
-        )
-        result = ctx.cmd.run(
-            [sys.executable, "-c", check_script],
-            check=False,
-        )
-        return result.stdout.strip() or result.stderr.strip()
+        info = self._probe_torch(ctx)
+        if info is None:
+            return "torch=未安装或探测失败"
+        return f"torch={info.version}, cuda_raw={info.cuda!r}, cuda_float={info.cuda_float}"
 
     def _is_torch_cuda_ready(self, ctx: AppContext, min_cuda_version: float) -> bool:
-        """检查 PyTorch 是否已安装且 CUDA 版本满足要求"""
-        check_script = (
-            "import sys\n"
-            "try:\n"
-            "    import torch\n"
-            "    cuda_ver = torch.version.cuda\n"
-            f"    if cuda_ver and float(cuda_ver) >= {min_cuda_version}:\n"
-            "        sys.exit(0)\n"
-            "    sys.exit(1)\n"
-            "except Exception as e:\n"
-            '    print(f"EXCEPTION: {type(e).__name__}: {e}", file=sys.stderr)\n'
-            "    sys.exit(1)\n"
-        )
-        result = ctx.cmd.run(
-            [sys.executable, "-c", check_script],
-            check=False,
-        )
-        logger.debug(f"  -> [DEBUG] _is_torch_cuda_ready: returncode={result.returncode}")
-        return result.returncode == 0
+        """检查 PyTorch 是否已安装且 CUDA 版本满足要求
+
+        进程内读取 version.py 只作快速预检：已能看出 CUDA 版本不足（含 CPU 版）时
+        直接判定未就绪。version.py 完好不代表 torch 可用（如依赖库缺失的残缺安装），
+        因此"已就绪"必须由子进程真实 import torch 确认。
+        """
+        required = parse_version(min_cuda_version)
+        if required is None:
+            return False
+
+        def satisfies(info: Optional[TorchInfo]) -> bool:
+            cuda_version = info.cuda_version if info is not None else None
+            return cuda_version is not None and cuda_version >= required
+
+        precheck = probe_torch_cuda()
+        if precheck is not None and not satisfies(precheck):
+            return False
+        return satisfies(self._probe_torch_import(ctx))
 
     @hookimpl
     def setup(self, context: AppContext) -> None:
@@ -81,13 +132,8 @@ class TorchAddon(BaseAddon):
 
         # 0. 执行前置任务 (环境修复等)
         tasks = self.get_tasks("setup")
-        if tasks:
-            results = TaskRunner.run_tasks(tasks, ctx)
-            # 检查是否有任务失败
-            from src.core.task import TaskResult
-            if TaskResult.FAILED in results.values():
-                failed_tasks = [name for name, r in results.items() if r == TaskResult.FAILED]
-                logger.warning(f"  -> [WARN] 部分任务执行失败: {failed_tasks}")
+        if tasks and not TaskRunner.run_tasks(tasks, ctx, self.name):
+            logger.warning("  -> [WARN] 部分任务执行失败，继续装配 Torch")
 
         # 1. 提取配置 (从 manifest.yaml)
         cfg = self.get_manifest(ctx)
@@ -112,6 +158,8 @@ class TorchAddon(BaseAddon):
         # 3. 真实的物理执行
         self._check_driver_version(ctx)
         self._install_torch(ctx)
+        # Torch 已变更，旧探测结果失效
+        self.clear_cache()
         
         # 产出
         ctx.artifacts.torch_installed = True
@@ -119,12 +167,20 @@ class TorchAddon(BaseAddon):
     def _check_driver_version(self, ctx: AppContext) -> None:
         """校验 NVIDIA 驱动版本 (无卡模式下跳过)"""
         try:
-            res = ctx.cmd.run(
-                ["nvidia-smi", "--query-gpu=driver_version", "--format=csv,noheader"],
-                check=True,
-            )
-            version_str = res.stdout.strip().split('\n')[0]
-            major_version = int(version_str.split('.')[0])
+            # 优先读取内核模块版本文件，无法读取时回退 nvidia-smi
+            version_output = read_nvidia_driver_version()
+            if version_output is None:
+                res = ctx.cmd.run(
+                    ["nvidia-smi", "--query-gpu=driver_version", "--format=csv,noheader"],
+                    check=True,
+                )
+                version_output = res.stdout
+            # 多卡输出时取第一个版本号
+            match = VERSION_RE.search(version_output)
+            if match is None:
+                raise ValueError(f"无法解析驱动版本: {version_output!r}")
+            version_str = match.group(0)
+            major_version = int(match.group(1))
             
             logger.info(f"  -> 当前宿主机驱动版本: {version_str}")
             if major_version < self.min_driver:
@@ -150,10 +206,6 @@ class TorchAddon(BaseAddon):
         
         logger.info("  -> Torch 算力引擎对齐完成！")
 
-    @hookimpl
-    def start(self, context: AppContext) -> None:
-        pass
-
-    @hookimpl
-    def sync(self, context: AppContext) -> None:
-        pass
\ No newline at end of file
+    # 无 start/sync 逻辑：显式沿用 BaseAddon 的 None 约定，由 main._run_addon 跳过
+    start = None
+    sync = None
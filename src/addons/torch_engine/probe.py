@@ -0,0 +1,105 @@
+"""
+Torch / NVIDIA 驱动信息进程内探测
+
+- Torch: 直接读取 torch 包内构建时生成的 version.py（含 __version__ 与 cuda 字段），
+  既不启动子解释器，也不 import torch（冷启动 import torch 需要数秒）。
+  只能说明包文件存在，用作"版本不足"的快速预检，可用性仍需子进程 import 确认。
+- 驱动: 读取内核模块导出的版本文件，无需 fork nvidia-smi。
+"""
+import importlib.util
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple
+
+
+# version.py 示例:
+#   __version__ = '2.6.0+cu124'
+#   cuda: Optional[str] = '12.4'     (旧版本无类型注解；CPU 版为 None)
+_VERSION_RE = re.compile(r"^__version__\s*(?::[^=\n]*)?=\s*['\"]([^'\"]+)['\"]", re.M)
+_CUDA_RE = re.compile(r"^cuda\s*(?::[^=\n]*)?=\s*(?:['\"]([^'\"]*)['\"]|None)", re.M)
+
+# 版本号（驱动 / CUDA 共用）: group(0) 为完整版本，group(1)/group(2) 为 major/minor
+VERSION_RE = re.compile(r"(\d+)(?:\.(\d+))?(?:\.\d+)*")
+
+# NVIDIA 内核模块导出的驱动版本（按优先级）
+#   /sys/module/nvidia/version:   "580.65.06"
+#   /proc/driver/nvidia/version:  "NVRM version: NVIDIA UNIX x86_64 Kernel Module  580.65.06  ..."
+NVIDIA_DRIVER_VERSION_FILES = (
+    Path("/sys/module/nvidia/version"),
+    Path("/proc/driver/nvidia/version"),
+)
+_DRIVER_VERSION_RE = re.compile(r"(?:^|\s)(\d+\.\d+(?:\.\d+)?)(?:\s|$)")
+
+
+@dataclass(frozen=True)
+class TorchInfo:
+    """已安装 Torch 的版本信息"""
+    version: str
+    cuda: Optional[str]  # 等价于 torch.version.cuda，CPU 版为 None
+
+    @property
+    def cuda_version(self) -> Optional[Tuple[int, int]]:
+        """CUDA 版本的 (major, minor)，缺失或无法解析时为 None"""
+        return parse_version(self.cuda) if self.cuda else None
+
+    @property
+    def cuda_float(self) -> Optional[float]:
+        """CUDA 版本的数值形式，缺失或无法解析时为 None"""
+        try:
+            return float(self.cuda) if self.cuda else None
+        except ValueError:
+            return None
+
+
+def parse_version(text: object) -> Optional[Tuple[int, int]]:
+    """提取文本中第一个版本号的 (major, minor)，缺少 minor 时按 0 处理
+
+    按整数元组比较，避免 float 把 "12.10" 当成 12.1。
+    """
+    match = VERSION_RE.search(str(text))
+    if match is None:
+        return None
+    return int(match.group(1)), int(match.group(2) or 0)
+
+
+def probe_torch_cuda() -> Optional[TorchInfo]:
+    """进程内读取 torch 版本与编译时 CUDA 版本
+
+    Returns:
+        TorchInfo；未安装 torch 或 version.py 无法解析时返回 None，由调用方回退到子进程探测
+    """
+    try:
+        spec = importlib.util.find_spec("torch")
+    except (ImportError, ValueError):
+        return None
+    if spec is None or not spec.submodule_search_locations:
+        return None
+
+    for location in spec.submodule_search_locations:
+        try:
+            text = (Path(location) / "version.py").read_text(encoding="utf-8")
+        except OSError:
+            continue
+        version = _VERSION_RE.search(text)
+        cuda = _CUDA_RE.search(text)
+        if version and cuda:
+            return TorchInfo(version=version.group(1), cuda=cuda.group(1) or None)
+    return None
+
+
+def read_nvidia_driver_version() -> Optional[str]:
+    """从内核模块版本文件读取 NVIDIA 驱动版本（如 "580.65.06"）
+
+    Returns:
+        驱动版本字符串；无驱动或无法解析时返回 None，由调用方回退到 nvidia-smi
+    """
+    for path in NVIDIA_DRIVER_VERSION_FILES:
+        try:
+            text = path.read_text(encoding="utf-8", errors="replace")
+        except OSError:
+            continue
+        match = _DRIVER_VERSION_RE.search(text)
+        if match:
+            return match.group(1)
+    return None
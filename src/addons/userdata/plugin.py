@@ -28,6 +28,11 @@ class UserdataAddon(BaseAddon):
             return GitRepoStrategy(repo_url.strip(), self.DATA_DIR_NAME, ctx.cmd)
         return LocalStrategy(ctx.project_root / self.EXAMPLE_DIR_NAME)
 
+    def sync_requires_network(self, context: AppContext) -> bool:
+        """配置了远程仓库时 sync 需要 git push"""
+        repo_url = self.get_manifest(context).get("userdata_repo") or ""
+        return bool(repo_url.strip())
+
     def _setup_symlink(self, comfy_path: Path, data_path: Path) -> None:
         """建立软链接: comfy_path → data_path"""
         name = comfy_path.name
@@ -4,6 +4,9 @@ Artifacts - 插件间共享的强类型数据容器
 支持持久化到 JSON 文件，实现跨进程共享（setup → start → sync）。
 """
 import json
+import os
+import stat
+import uuid
 from dataclasses import dataclass, fields
 from pathlib import Path
 from typing import Optional, Any, Dict
@@ -61,6 +64,10 @@ class Artifacts:
         """
         保存 artifacts 到 JSON 文件。
         
+        先写入同目录临时文件再 os.replace，避免中途崩溃留下半截文件。
+        临时文件以 O_EXCL 新建、请求 0666，由内核按 umask 计算权限（不在运行时切换 umask）；
+        覆盖已有文件时沿用其原有权限。
+        
         Args:
             project_root: 项目根目录，文件将保存为 {project_root}/.artifacts.json
         """
@@ -74,7 +81,19 @@ class Artifacts:
             else:
                 data[field.name] = value
         
-        file_path.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+        tmp_path = project_root / f"{ARTIFACTS_FILENAME}.{uuid.uuid4().hex[:8]}.tmp"
+        fd = os.open(tmp_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            try:
+                os.chmod(tmp_path, stat.S_IMODE(os.stat(file_path).st_mode))
+            except FileNotFoundError:
+                pass
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
 
     @classmethod
     def load(cls, project_root: Path) -> "Artifacts":
@@ -3,7 +3,7 @@
 """
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, Dict, List
+from typing import TYPE_CHECKING, Any, Callable, ClassVar, Dict, List, Optional
 
 import pluggy
 
@@ -56,16 +56,19 @@ class BaseAddon:
     """插件基类
     
     子类必须声明 module_dir 类属性（= 所在目录名），
-    name 属性由基类统一从 module_dir 派生，子类无需覆盖。
+    name 类属性由基类在子类定义时统一从 module_dir 派生，子类无需覆盖。
     """
     
     # 子类必须声明，值 = 插件所在目录名
-    module_dir: str
+    module_dir: ClassVar[str]
+    # 插件唯一标识 = 所在目录名（普通类属性，pipeline 频繁读取时无描述符开销）
+    name: ClassVar[str]
     
-    @property
-    def name(self) -> str:
-        """插件唯一标识 = 所在目录名，由 module_dir 派生"""
-        return self.module_dir
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        module_dir = cls.__dict__.get("module_dir")
+        if module_dir is not None:
+            cls.name = module_dir
     
     def log(self, context: AppContext, action: str, message: str = "") -> None:
         """记录执行日志"""
@@ -97,17 +100,21 @@ class BaseAddon:
         """
         return []
 
+    def sync_requires_network(self, context: AppContext) -> bool:
+        """
+        sync 阶段是否需要网络（如推送远程仓库）
+        
+        默认返回 False，需要访问远程的插件重写此方法。
+        所有插件都返回 False 时，sync 跳过 setup_network()。
+        """
+        return False
+
     @hookspec
     def setup(self, context: AppContext) -> None:
         """初始化钩子"""
         ...
     
-    @hookspec
-    def start(self, context: AppContext) -> None:
-        """启动钩子"""
-        ...
-    
-    @hookspec
-    def sync(self, context: AppContext) -> None:
-        """同步钩子"""
-        ...
+    # start / sync 为可选钩子：子类实现为方法；无对应逻辑时保持（或显式置为）None，
+    # 由 src.main._run_addon 统一跳过。调用方须经 _run_addon 调度，不要直接 addon.start(ctx)
+    start: Optional[Callable[[AppContext], None]] = None  # 启动钩子
+    sync: Optional[Callable[[AppContext], None]] = None   # 同步钩子
@@ -1,11 +1,13 @@
 """
 工具函数
 """
+import atexit
 import logging
 import os
 import signal
 import subprocess
 import sys
+import time
 from pathlib import Path
 from typing import Optional
 
@@ -31,6 +33,8 @@ def setup_logger(log_file: Path, debug: bool = False) -> logging.Logger:
     console_handler.setFormatter(console_formatter)
 
     # 文件 Handler (DEBUG 级别，详细日志)
+    # 数据盘目录可能尚未创建（如本地开发环境），先确保存在
+    log_file.parent.mkdir(parents=True, exist_ok=True)
     file_handler = logging.FileHandler(log_file, encoding="utf-8")
     file_handler.setLevel(logging.DEBUG)
     file_formatter = logging.Formatter(
@@ -79,6 +83,83 @@ def kill_process_by_name(pattern: str, exclude_pid: Optional[int] = None) -> Non
         pass
 
 
+def _pid_alive(pid: int) -> bool:
+    """判断 PID 对应的进程是否存活"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # 进程存在，但属于其他用户
+    return True
+
+
+def _wait_for_exit(pid: int, timeout: float, interval: float = 0.1) -> bool:
+    """在 timeout 秒内轮询等待进程退出，返回是否已退出（timeout 为 0 时不等待）"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(interval)
+        if not _pid_alive(pid):
+            return True
+    return False
+
+
+def _create_pidfile(pid_file: Path) -> bool:
+    """以 O_CREAT|O_EXCL 原子创建 pidfile 并写入当前 PID，文件已存在时返回 False"""
+    try:
+        fd = os.open(pid_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+    except FileExistsError:
+        return False
+    try:
+        os.write(fd, str(os.getpid()).encode())
+    finally:
+        os.close(fd)
+    atexit.register(_release_pidfile, pid_file, os.getpid())
+    return True
+
+
+def claim_pidfile(pid_file: Path, wait: float = 0.0) -> Optional[int]:
+    """
+    原子创建 pid_file 并写入当前进程 PID，返回上一个仍存活的实例 PID（没有则返回 None）
+    
+    用于在启动时判断是否需要调用 kill_process_by_name：
+    pidfile 不存在或记录的进程已退出时，无需再扫描整张进程表。
+    pidfile 已存在时先做存活检查，确认记录的进程已退出（或内容无法解析）才删除并重试创建一次；
+    仍存活时最多等待 wait 秒让其退出；仍未退出则不覆盖 pidfile，由调用方清理旧实例后再次调用。
+    进程退出时自动删除自己写入的 pidfile。
+    
+    Args:
+        pid_file: pidfile 路径
+        wait: 旧实例仍存活时等待其退出的最长秒数（默认不等待）
+    """
+    try:
+        for _ in range(2):
+            if _create_pidfile(pid_file):
+                return None
+            try:
+                prev_pid: Optional[int] = int(pid_file.read_text().strip())
+            except ValueError:
+                prev_pid = None
+            except FileNotFoundError:
+                continue  # 读取前已被上一个实例释放，直接重试
+            if prev_pid is not None and prev_pid != os.getpid() and _pid_alive(prev_pid):
+                if not _wait_for_exit(prev_pid, wait):
+                    return prev_pid
+            pid_file.unlink(missing_ok=True)
+    except OSError:
+        pass
+    return None
+
+
+def _release_pidfile(pid_file: Path, pid: int) -> None:
+    """仅当 pidfile 仍属于当前进程时删除（可能已被新实例接管）"""
+    try:
+        if pid_file.read_text().strip() == str(pid):
+            pid_file.unlink()
+    except (OSError, ValueError):
+        pass
+
+
 def release_port(port: int) -> None:
     """释放指定端口，确保服务能正常启动"""
     try:
@@ -15,7 +15,7 @@ import shutil
 import subprocess
 import sys
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 from urllib.parse import urlparse
 
 from src.core.schema import EnvKey
@@ -66,6 +66,8 @@ class Aria2Strategy(DownloadStrategy):
         self._file_allocation = cfg.get("file_allocation", "none")
         # URI 选择
         self._uri_selector    = cfg.get("uri_selector", "adaptive")
+        # aria2c 可用性缓存（None = 未探测），避免每次下载都扫描 $PATH
+        self._available: Optional[bool] = None
 
     @staticmethod
     def _load_config() -> Dict[str, Any]:
@@ -90,7 +92,9 @@ class Aria2Strategy(DownloadStrategy):
     # ── 可用性 ──────────────────────────────────────────────
 
     def is_available(self) -> bool:
-        return shutil.which("aria2c") is not None
+        if self._available is None:
+            self._available = shutil.which("aria2c") is not None
+        return self._available
 
     def ensure_available(self) -> bool:
         if self.is_available():
@@ -108,6 +112,8 @@ class Aria2Strategy(DownloadStrategy):
                 check=True, capture_output=True, text=True,
             )
             logger.info("  -> [aria2] 安装完成。")
+            # 安装后重新探测
+            self._available = None
             return True
         except subprocess.CalledProcessError as e:
             stderr_msg = e.stderr.strip() if e.stderr else "未知错误"
@@ -126,12 +132,14 @@ class Aria2Strategy(DownloadStrategy):
     def post_download(self, target_path: Path) -> None:
         """清理 aria2 产生的 .aria2 控制文件"""
         aria2_ctrl = Path(str(target_path) + ".aria2")
-        if aria2_ctrl.exists():
-            try:
-                aria2_ctrl.unlink()
-                logger.debug(f"  -> [aria2] 已清理控制文件: {aria2_ctrl.name}")
-            except OSError as e:
-                logger.debug(f"  -> [aria2] 清理控制文件失败: {e}")
+        # 直接 unlink，不存在时由异常兜底（省去一次 exists 的 stat）
+        try:
+            aria2_ctrl.unlink()
+            logger.debug(f"  -> [aria2] 已清理控制文件: {aria2_ctrl.name}")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.debug(f"  -> [aria2] 清理控制文件失败: {e}")
 
     def on_interrupt(self, target_path: Path) -> None:
         """用户中断时保留 .aria2 控制文件（支持断点续传）"""
@@ -259,6 +267,7 @@ class Aria2Strategy(DownloadStrategy):
             process.wait()
             return process.returncode == 0 and target_path.exists()
         except FileNotFoundError:
+            self._available = False
             logger.error("  -> [ERROR] aria2c 未安装，请运行: apt install aria2")
             return False
         except Exception as e:
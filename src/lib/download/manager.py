@@ -9,12 +9,12 @@
 
 扩展新策略:
   1. 创建新策略类，继承 DownloadStrategy
-  2. 在 _register_strategies() 中注册
+  2. 在 _register_strategies() 中注册策略类（首次使用时才实例化）
   3. 在 get_strategy() 中添加选择逻辑
 """
 import logging
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Type
 
 from src.lib.download.base import CacheEntry, DownloadStrategy, PurgeResult
 from src.lib.download.aria2 import Aria2Strategy
@@ -36,12 +36,14 @@ class DownloadManager:
     
     扩展示例（添加 wget 策略）:
       1. 创建 src/lib/download/wget.py，实现 WgetStrategy(DownloadStrategy)
-      2. 在 _register_strategies() 中添加: self._strategies["wget"] = WgetStrategy()
+      2. 在 _register_strategies() 中添加: self._strategy_classes["wget"] = WgetStrategy
       3. 在 get_strategy() 中添加选择逻辑
     """
 
     def __init__(self) -> None:
-        # 策略注册表: name -> strategy instance
+        # 策略注册表: name -> strategy class
+        self._strategy_classes: Dict[str, Type[DownloadStrategy]] = {}
+        # 已实例化的策略: name -> strategy instance（首次使用时构造，构造会读取配置）
         self._strategies: Dict[str, DownloadStrategy] = {}
         self._register_strategies()
         
@@ -55,16 +57,24 @@ class DownloadManager:
         
         扩展点: 新增策略时在此注册
         """
-        self._strategies["aria2"] = Aria2Strategy()
+        self._strategy_classes["aria2"] = Aria2Strategy
         
         # 示例: 未来可以添加更多策略
-        # self._strategies["wget"] = WgetStrategy()
-        # self._strategies["curl"] = CurlStrategy()
+        # self._strategy_classes["wget"] = WgetStrategy
+        # self._strategy_classes["curl"] = CurlStrategy
+
+    def _get_registered(self, name: str) -> DownloadStrategy:
+        """按名称获取策略实例，首次访问时构造并缓存"""
+        strategy = self._strategies.get(name)
+        if strategy is None:
+            strategy = self._strategy_classes[name]()
+            self._strategies[name] = strategy
+        return strategy
 
     @property
     def _all_strategies(self) -> List[DownloadStrategy]:
         """所有已注册策略的列表"""
-        return list(self._strategies.values())
+        return [self._get_registered(name) for name in self._strategy_classes]
 
     # ── 懒加载 ──────────────────────────────────────────────
 
@@ -75,8 +85,8 @@ class DownloadManager:
         self._initialized = True
 
         # 确保默认策略可用
-        default_strategy = self._strategies.get(self._default_strategy_name)
-        if default_strategy and not default_strategy.is_available():
+        default_strategy = self._get_registered(self._default_strategy_name)
+        if not default_strategy.is_available():
             default_strategy.ensure_available()
 
     # ── 策略选择 ─────────────────────────────────────────────
@@ -100,13 +110,13 @@ class DownloadManager:
         
         # ── 策略选择逻辑 ──
         # 扩展示例: 
-        # if _url_type == "magnet" and "torrent" in self._strategies:
-        #     strategy = self._strategies["torrent"]
+        # if _url_type == "magnet" and "torrent" in self._strategy_classes:
+        #     strategy = self._get_registered("torrent")
         #     if strategy.is_available():
         #         return strategy
         
         # 默认: 所有 URL 类型使用 aria2 多线程下载
-        return self._strategies[self._default_strategy_name]
+        return self._get_registered(self._default_strategy_name)
 
     # ── 下载 ─────────────────────────────────────────────────
 
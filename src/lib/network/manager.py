@@ -22,7 +22,7 @@ from typing import Any, Dict, List, Optional
 
 import yaml
 
-from src.lib.network.config import EXPORT_KEYS
+from src.lib.network.config import EXPORT_KEYS, PROJECT_ROOT
 from src.lib.network.turbo import load_autodl_turbo
 from src.lib.network.mirror import load_hf_mirror
 from src.lib.network.token import load_api_tokens
@@ -67,7 +67,7 @@ def _load_yaml(path: Path) -> Dict[str, Any]:
 
 def _get_project_root() -> Path:
     """获取项目根目录（与 main.py 保持一致）"""
-    return Path(__file__).resolve().parent.parent.parent.parent
+    return PROJECT_ROOT
 
 
 def _get_backup_mihomo_dir() -> Path:
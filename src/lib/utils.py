@@ -3,17 +3,25 @@
 """
 import hashlib
 from pathlib import Path
-from typing import Any, Dict
+from typing import IO, Any, Dict
 
 import yaml
 
+# 优先使用 libyaml 的 C 解析器（model-lock.yaml 等大文件解析快一个数量级），不可用时回退纯 Python 实现
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
 
 def load_yaml(path: Path) -> Dict[str, Any]:
     """加载 YAML 文件"""
     if not path.exists():
         return {}
     with open(path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f) or {}
+        return load_yaml_stream(f)
+
+
+def load_yaml_stream(stream: IO[str]) -> Dict[str, Any]:
+    """从已打开的文本流解析 YAML（与 load_yaml 共用 libyaml 解析器）"""
+    return yaml.load(stream, Loader=_YAML_LOADER) or {}
 
 
 def save_yaml(path: Path, data: Dict[str, Any]) -> None:
@@ -22,13 +30,25 @@ def save_yaml(path: Path, data: Dict[str, Any]) -> None:
         yaml.dump(data, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
 
 
+# 回退路径的读缓冲大小（模型文件多为 GB 级，8 KiB 分块的 Python 循环开销过高）
+_HASH_BUFFER_SIZE = 1 << 20
+
+
 def sha256(file_path: Path) -> str:
-    """计算文件 SHA256 哈希"""
-    h = hashlib.sha256()
-    with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(8192), b""):
-            h.update(chunk)
-    return h.hexdigest()
+    """计算文件 SHA256 哈希
+
+    Python 3.11+ 使用 hashlib.file_digest（C 层循环，直接走 OpenSSL 加速实现）；
+    3.10 回退到复用单个缓冲区的 readinto 循环。
+    """
+    with open(file_path, "rb", buffering=0) as f:
+        if hasattr(hashlib, "file_digest"):
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        h = hashlib.sha256()
+        buf = bytearray(_HASH_BUFFER_SIZE)
+        view = memoryview(buf)
+        while n := f.readinto(buf):
+            h.update(view[:n])
+        return h.hexdigest()
 
 
 def format_size(size_kb: int) -> str:
@@ -5,16 +5,17 @@ import argparse
 import logging
 import os
 import sys
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from graphlib import TopologicalSorter
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
-import yaml
-
 from src.core.interface import AppContext, BaseAddon
 from src.core.adapters import SubprocessRunner, FileStateManager
 from src.core.artifacts import Artifacts
-from src.core.utils import setup_logger, logger, kill_process_by_name
+from src.core.utils import setup_logger, logger, kill_process_by_name, claim_pidfile
 from src.lib.network import setup_network, sync_proxy_config, invalidate_network_cache
+from src.lib.utils import load_yaml
 
 # 插件导入
 from src.addons.system.plugin import SystemAddon
@@ -29,9 +30,24 @@ from src.addons.models.plugin import ModelAddon
 # ============================================================
 # 全局常量
 # ============================================================
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
 BASE_DIR = Path("/root/autodl-tmp")
 COMFY_DIR = Path("/root/ComfyUI")  # ComfyUI 安装目录（系统盘）
 DEFAULT_PORT = 6006
+PIDFILE_RECLAIM_TIMEOUT = 5.0  # 清理旧实例后等待其退出的最长秒数
+
+# 插件依赖关系（DAG）：key 依赖 value 中列出的插件
+# create_pipeline() 的列表顺序即为该 DAG 的一个合法拓扑序
+# 新增插件须在此登记；未登记的插件并行时保守地依赖其之前的全部插件
+PIPELINE_DEPENDENCIES: Dict[str, List[str]] = {
+    "system": [],
+    "git_config": ["system"],
+    "torch_engine": ["system"],
+    "comfy_core": ["torch_engine"],
+    "userdata": ["git_config", "comfy_core"],  # GitRepoStrategy 需要 SSH 密钥
+    "nodes": ["userdata"],                     # 快照位于 user/__manager（userdata 软链接）
+    "models": ["comfy_core"],
+}
 
 
 def create_pipeline() -> List[BaseAddon]:
@@ -49,6 +65,8 @@ def create_pipeline() -> List[BaseAddon]:
     
     注意: 代理服务（turbo / mihomo）在 setup_network() 中已初始化，
     不作为 pipeline 插件，因为所有插件都依赖网络。
+    
+    插件间依赖见 PIPELINE_DEPENDENCIES，setup --jobs N 时据此并行执行。
     """
     return [
         SystemAddon(),
@@ -87,22 +105,26 @@ def load_manifests(project_root: Path) -> Dict[str, Dict[str, Any]]:
                 continue
             manifest_file = module_dir / "manifest.yaml"
             if manifest_file.exists():
-                with open(manifest_file, "r", encoding="utf-8") as f:
-                    manifests[module_dir.name] = yaml.safe_load(f) or {}
+                manifests[module_dir.name] = load_yaml(manifest_file)
                 config_logger.debug(f"  -> [Manifest] 已加载: {manifest_file.relative_to(project_root)}")
     
     return manifests
 
 
-def create_context(debug: bool = False, load_artifacts: bool = False) -> AppContext:
+def create_context(
+    debug: bool = False,
+    load_artifacts: bool = False,
+    manifests: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> AppContext:
     """
     创建应用上下文
     
     Args:
         debug: 调试模式
         load_artifacts: 是否从持久化文件加载 artifacts（用于 start/sync 阶段）
+        manifests: 预加载的 manifest 配置，None 时从 project_root 扫描加载
     """
-    project_root = Path(__file__).resolve().parent.parent
+    project_root = PROJECT_ROOT
     
     # 根据场景决定是否加载已持久化的 artifacts
     if load_artifacts:
@@ -118,15 +140,74 @@ def create_context(debug: bool = False, load_artifacts: bool = False) -> AppCont
         state=FileStateManager(BASE_DIR),
         artifacts=artifacts,
         debug=debug,
-        addon_manifests=load_manifests(project_root),
+        addon_manifests=manifests if manifests is not None else load_manifests(project_root),
     )
 
 
+def needs_network(action: str, context: AppContext, only: Optional[str] = None) -> bool:
+    """
+    判断当前动作是否需要初始化网络环境
+    
+    setup/start 总是需要；sync 仅当参与执行的插件中有需要访问远程的
+    （见 BaseAddon.sync_requires_network）时才需要。
+    """
+    if action != "sync":
+        return True
+    pipeline = [a for a in create_pipeline() if not only or a.name == only]
+    return any(a.sync_requires_network(context) for a in pipeline)
+
+
+def _run_addon(addon: BaseAddon, action: str, context: AppContext) -> None:
+    """执行单个插件的生命周期方法（插件未实现该方法或置为 None 时跳过）
+
+    插件钩子的唯一调度入口：start / sync 可能为 None（见 BaseAddon），不要直接调用。
+    """
+    logger.info(f"  -> {addon.name}")
+    method = getattr(addon, action, None)
+    if method:
+        method(context)
+
+
+def _execute_parallel(
+    pipeline: List[BaseAddon],
+    action: str,
+    context: AppContext,
+    jobs: int,
+) -> None:
+    """
+    按 PIPELINE_DEPENDENCIES 拓扑排序，并行执行无依赖关系的插件
+    
+    各插件只写入 Artifacts 中属于自己的字段，无需额外加锁。
+    依赖不在 pipeline 中的插件（如 --until 截断）视为已满足；
+    未在 PIPELINE_DEPENDENCIES 登记的插件依赖 pipeline 中排在它之前的全部插件。
+    """
+    by_name = {a.name: a for a in pipeline}
+    sorter: TopologicalSorter[str] = TopologicalSorter()
+    for index, addon in enumerate(pipeline):
+        declared = PIPELINE_DEPENDENCIES.get(addon.name)
+        if declared is None:
+            declared = [a.name for a in pipeline[:index]]
+        deps = [d for d in declared if d in by_name]
+        sorter.add(addon.name, *deps)
+    sorter.prepare()
+    
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        running: Dict[Future[None], str] = {}
+        while sorter.is_active():
+            for name in sorter.get_ready():
+                running[pool.submit(_run_addon, by_name[name], action, context)] = name
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                future.result()  # 传播插件异常（含 sys.exit）
+                sorter.done(running.pop(future))
+
+
 def execute(
     action: str, 
     context: AppContext, 
     until: Optional[str] = None,
     only: Optional[str] = None,
+    jobs: int = 1,
 ) -> None:
     """
     执行插件 Pipeline
@@ -136,12 +217,13 @@ def execute(
         context: 应用上下文
         until: 执行到指定插件为止（包含）
         only: 只执行指定插件（跳过依赖，危险模式）
+        jobs: setup 阶段并行执行的插件数，1 为按声明顺序串行执行
     """
     pipeline = create_pipeline()
     
     # sync 动作逆序执行
     if action == "sync":
-        pipeline = list(reversed(pipeline))
+        pipeline = pipeline[::-1]
     
     # --only: 只执行单个插件
     if only:
@@ -151,24 +233,27 @@ def execute(
             sys.exit(1)
         
         logger.info(f"\n>>> 单独执行: {addon.name}.{action}()")
-        method = getattr(addon, action, None)
-        if method:
-            method(context)
+        _run_addon(addon, action, context)
         return
     
-    # 正常顺序执行
+    # --until: 截断到指定插件（包含）
+    if until:
+        names = [a.name for a in pipeline]
+        if until in names:
+            pipeline = pipeline[:names.index(until) + 1]
+    
     logger.info(f"\n>>> 开始执行 Pipeline: [{action.upper()}]")
     
-    for addon in pipeline:
-        logger.info(f"  -> {addon.name}")
-        method = getattr(addon, action, None)
-        if method:
-            method(context)
-        
-        # --until: 执行到指定插件停止
-        if until and addon.name == until:
-            logger.info(f"  -> 已到达目标插件 [{until}]，停止")
-            break
+    # 仅 setup 支持并行：start 会阻塞在 ComfyUI 进程，
+    # sync 存在隐式顺序依赖（userdata 推送 nodes/models 的产出）
+    if action == "setup" and jobs > 1:
+        _execute_parallel(pipeline, action, context, jobs)
+    else:
+        for addon in pipeline:
+            _run_addon(addon, action, context)
+    
+    if until and pipeline and pipeline[-1].name == until:
+        logger.info(f"  -> 已到达目标插件 [{until}]，停止")
     
     # setup 完成后持久化 artifacts，供后续 start/sync 使用
     if action == "setup":
@@ -179,40 +264,59 @@ def execute(
             logger.error(f"  -> Artifacts 持久化失败: {e}")
 
 
-def main() -> None:
+def main(argv: Optional[List[str]] = None) -> None:
+    """CLI 入口
+
+    Args:
+        argv: 命令行参数（不含程序名），None 时读取 sys.argv
+    """
     parser = argparse.ArgumentParser(description="AutoDL 自动化装配调度器")
     parser.add_argument("action", choices=["setup", "start", "sync"], help="生命周期动作")
     parser.add_argument("--debug", action="store_true", help="调试模式")
     parser.add_argument("--until", type=str, help="执行到指定插件为止")
     parser.add_argument("--only", type=str, help="只执行指定插件（危险模式）")
-    args = parser.parse_args()
+    parser.add_argument(
+        "--jobs", type=int, default=1,
+        help="setup 阶段并行执行的插件数（默认 1，顺序执行；并行时各插件的日志与安装命令的实时输出会交错显示）",
+    )
+    args = parser.parse_args(argv)
 
     # 初始化日志（必须在所有其他操作之前）
     log_file = BASE_DIR / "autodl-setup.log"
     setup_logger(log_file, debug=args.debug)
 
-    # 清理残留进程
-    kill_process_by_name("python.*src.main", exclude_pid=os.getpid())
+    # 清理残留进程（仅当上一个实例仍存活时才扫描进程表）
+    pid_file = BASE_DIR / "autodl-setup.pid"
+    if claim_pidfile(pid_file) is not None:
+        kill_process_by_name("python.*src.main", exclude_pid=os.getpid())
+        # 旧实例收到 SIGTERM 后可能尚未退出，等待其退出后重新接管 pidfile
+        prev_pid = claim_pidfile(pid_file, wait=PIDFILE_RECLAIM_TIMEOUT)
+        if prev_pid is not None:
+            logger.warning(
+                f"  -> [WARN] 旧实例 (PID {prev_pid}) 在 {PIDFILE_RECLAIM_TIMEOUT:g}s 内未退出，"
+                f"本实例未接管 pidfile"
+            )
 
     # setup 动作时清除网络状态缓存，确保走完整初始化流程
     # 其他动作（start/sync）以及独立 CLI（model download）则复用缓存
     if args.action == "setup":
         invalidate_network_cache()
 
-    # 初始化网络环境 (代理 + 镜像 + Token)
-    setup_network()
-
-    # 创建上下文并执行
+    # 创建上下文
     # start/sync 需要加载 setup 阶段持久化的 artifacts
     load_artifacts = args.action in ("start", "sync")
     context = create_context(debug=args.debug, load_artifacts=load_artifacts)
 
+    # 初始化网络环境 (代理 + 镜像 + Token)，sync 无远程操作时跳过
+    if needs_network(args.action, context, only=args.only):
+        setup_network()
+
     # sync 阶段：先将 mihomo 运行时配置同步回持久化目录
     # 必须在 execute 之前，因为 userdata addon 的 sync 会 git add . && push
     if args.action == "sync":
         sync_proxy_config()
 
-    execute(args.action, context, until=args.until, only=args.only)
+    execute(args.action, context, until=args.until, only=args.only, jobs=args.jobs)
 
 
 if __name__ == "__main__":
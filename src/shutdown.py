@@ -9,7 +9,7 @@ AutoDL 关机同步脚本
 import argparse
 from pathlib import Path
 
-from src.main import create_context, execute, BASE_DIR
+from src.main import create_context, execute, needs_network, BASE_DIR
 from src.core.utils import logger, setup_logger
 from src.lib.network import setup_network, stop_proxy
 
@@ -21,10 +21,7 @@ def main() -> None:
 
     # 初始化日志（必须在所有 logger 调用之前）
     log_file = BASE_DIR / "autodl-setup.log"
-    setup_logger(log_file)
-
-    # 初始化网络环境（sync 可能需要 git push 等网络操作）
-    setup_network()
+    setup_logger(log_file, debug=args.debug)
 
     logger.info("\n" + "=" * 50)
     logger.info(">>> AutoDL 关机同步 - 开始执行环境快照...")
@@ -33,6 +30,10 @@ def main() -> None:
     # sync 需要加载 setup 阶段持久化的 artifacts
     context = create_context(debug=args.debug, load_artifacts=True)
     
+    # 初始化网络环境（仅当 sync 有 git push 等远程操作时）
+    if needs_network("sync", context):
+        setup_network()
+    
     # 执行 sync 动作 (execute 内部会自动逆序执行)
     execute("sync", context)
     
@@ -10,6 +10,16 @@ from src.core.interface import AppContext
 from src.core.artifacts import Artifacts
 from tests.mocks import MockRunner, MockStateManager
 
+# 项目根目录（conftest 导入时解析一次）
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture(autouse=True)
+def _no_inprocess_gpu_probe(monkeypatch) -> None:
+    """屏蔽 Torch/驱动的进程内探测，使 TorchAddon 统一走 MockRunner 可控的命令探测路径"""
+    monkeypatch.setattr("src.addons.torch_engine.plugin.probe_torch_cuda", lambda: None)
+    monkeypatch.setattr("src.addons.torch_engine.plugin.read_nvidia_driver_version", lambda: None)
+
 
 @pytest.fixture
 def mock_runner() -> MockRunner:
@@ -23,10 +33,10 @@ def mock_state() -> MockStateManager:
     return MockStateManager()
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def project_root() -> Path:
     """返回项目根目录"""
-    return Path(__file__).resolve().parent.parent
+    return _PROJECT_ROOT
 
 
 @pytest.fixture
@@ -80,10 +90,9 @@ def context_with_comfy(app_context: AppContext, tmp_base_dir: Path) -> AppContex
     用于测试依赖 comfy_dir 的下游插件（nodes, userdata, models）
     """
     comfy_dir = tmp_base_dir / "ComfyUI"
-    comfy_dir.mkdir(parents=True, exist_ok=True)
-    (comfy_dir / "custom_nodes").mkdir(parents=True, exist_ok=True)
-    (comfy_dir / "user").mkdir(parents=True, exist_ok=True)
-    (comfy_dir / "models").mkdir(parents=True, exist_ok=True)
+    # 只创建叶子目录，comfy_dir 由 parents=True 顺带创建
+    for sub in ("custom_nodes", "user", "models"):
+        (comfy_dir / sub).mkdir(parents=True, exist_ok=True)
     
     app_context.artifacts.comfy_dir = comfy_dir
     app_context.artifacts.custom_nodes_dir = comfy_dir / "custom_nodes"
@@ -3,19 +3,32 @@
 
 提供预配置的 AppContext，用于测试完整的 Pipeline 执行流程。
 """
-import pytest
+import copy
 from pathlib import Path
+from typing import Any, Dict
+
+import pytest
 
 from src.core.interface import AppContext
 from src.core.artifacts import Artifacts
+from src.core.ports import CommandResult
 from src.main import load_manifests
 from tests.mocks import MockRunner, MockStateManager
 
+# 真实项目根目录（conftest 导入时解析一次）
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
 
-@pytest.fixture
+
+@pytest.fixture(scope="session")
 def integration_project_root() -> Path:
     """返回真实项目根目录（用于加载 manifest.yaml）"""
-    return Path(__file__).resolve().parent.parent.parent
+    return _PROJECT_ROOT
+
+
+@pytest.fixture(scope="session")
+def integration_manifests(integration_project_root: Path) -> Dict[str, Dict[str, Any]]:
+    """真实 manifest.yaml 只在整个测试会话中解析一次"""
+    return load_manifests(integration_project_root)
 
 
 @pytest.fixture
@@ -35,6 +48,21 @@ def integration_base_dir(tmp_path: Path) -> Path:
     return base
 
 
+@pytest.fixture
+def integration_workdir(tmp_path: Path, integration_project_root: Path) -> Path:
+    """
+    隔离的项目工作目录（作为 context.project_root）
+    
+    插件会在 project_root 下写入数据（如 my-comfyui-backup），
+    这里将 src 与示例数据软链接回真实项目，写入全部落在 tmp_path 中。
+    """
+    workdir = tmp_path / "autodl-instance"
+    workdir.mkdir(parents=True, exist_ok=True)
+    for name in ("src", "my-comfyui-backup.example"):
+        (workdir / name).symlink_to(integration_project_root / name, target_is_directory=True)
+    return workdir
+
+
 @pytest.fixture
 def integration_comfy_dir(tmp_path: Path) -> Path:
     """
@@ -55,8 +83,6 @@ def integration_runner() -> MockRunner:
     runner = MockRunner()
     
     # 预设常见命令的成功返回
-    from src.core.ports import CommandResult
-    
     # uv 相关
     runner.stub_results["uv --version"] = CommandResult(
         returncode=0, stdout="uv 0.1.0", stderr="", command="uv --version"
@@ -85,27 +111,29 @@ def integration_state() -> MockStateManager:
 def integration_context(
     integration_runner: MockRunner,
     integration_state: MockStateManager,
-    integration_project_root: Path,
+    integration_workdir: Path,
+    integration_manifests: Dict[str, Dict[str, Any]],
     integration_base_dir: Path,
     integration_comfy_dir: Path,
 ) -> AppContext:
     """
     集成测试用的完整 AppContext
     
-    - 使用真实的 project_root（加载真实 manifest.yaml）
-    - 使用 tmp_path 作为 base_dir（隔离文件系统）
+    - 加载真实项目的 manifest.yaml
+    - 使用 tmp_path 作为 project_root / base_dir（隔离文件系统）
     - 使用 MockRunner（不执行真实命令）
     - 使用 MockStateManager（内存状态）
     """
     return AppContext(
-        project_root=integration_project_root,
+        project_root=integration_workdir,
         base_dir=integration_base_dir,
         comfy_dir=integration_comfy_dir,
         cmd=integration_runner,
         state=integration_state,
         artifacts=Artifacts(),
         debug=True,
-        addon_manifests=load_manifests(integration_project_root),
+        # 深拷贝会话级缓存，避免测试修改 manifest 时互相污染
+        addon_manifests=copy.deepcopy(integration_manifests),
     )
 
 
@@ -132,7 +160,8 @@ def context_with_home(
     uv_bin_dir.mkdir(parents=True, exist_ok=True)
     (uv_bin_dir / "uv").touch()
     
-    # Mock Path.home()
-    monkeypatch.setattr(Path, "home", lambda: fake_home)
+    # Path.home() 经 HOME（Windows 为 USERPROFILE）解析，无需 patch 类方法
+    monkeypatch.setenv("HOME", str(fake_home))
+    monkeypatch.setenv("USERPROFILE", str(fake_home))
     
     return integration_context
@@ -6,6 +6,7 @@ Setup Pipeline 集成测试
 """
 import pytest
 from pathlib import Path
+from unittest.mock import patch
 
 from src.main import execute
 from src.core.interface import AppContext
@@ -139,15 +140,11 @@ class TestSetupOnlyMode:
         这证明了 --only 模式的危险性：它跳过依赖检查，
         如果插件依赖前序插件的产出，会导致运行时错误。
         """
-        from unittest.mock import patch
-        
         # 确保 comfy-cli 不存在，强制进入 uv 安装流程
         with patch("shutil.which", return_value=None):
-            with pytest.raises(RuntimeError) as exc_info:
+            # 错误信息应包含依赖提示
+            with pytest.raises(RuntimeError, match=r"(?i)uv|SystemAddon"):
                 execute("setup", context_with_home, only="comfy_core")
-        
-        # 验证错误信息包含依赖提示
-        assert "uv" in str(exc_info.value).lower() or "SystemAddon" in str(exc_info.value)
 
 
 class TestSetupFullPipeline:
@@ -4,19 +4,25 @@
 提供 ICommandRunner 和 IStateManager 的测试替身，
 用于单元测试中隔离外部依赖（subprocess、文件系统）。
 """
-from dataclasses import dataclass, field
+import re
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from itertools import chain
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Deque, Dict, FrozenSet, Iterable, List, Optional, Set
 
 from src.core.ports import ICommandRunner, IStateManager, CommandResult
 
 
-@dataclass
+@dataclass(slots=True)
 class CallRecord:
-    """记录一次调用"""
+    """记录一次调用（run_realtime 不传递后四个参数，保持默认值）"""
     cmd: str
     cwd: Optional[Path] = None
-    kwargs: Dict[str, Any] = field(default_factory=dict)
+    timeout: Optional[int] = None
+    check: bool = True
+    shell: bool = False
+    capture_output: bool = True
 
 
 class MockRunner(ICommandRunner):
@@ -25,6 +31,8 @@ class MockRunner(ICommandRunner):
     
     - 记录所有调用，可在测试中断言
     - 支持通过 stub_results 预设特定命令的返回值
+    - 支持通过 stub_sequence 预设特定命令依次返回的结果（用完后回落到 stub_results）
+    - 支持通过 exception_for 预设特定命令抛出的异常（如 FileNotFoundError）
     - 默认返回 returncode=0 的成功结果
     """
     
@@ -33,15 +41,42 @@ class MockRunner(ICommandRunner):
         self.realtime_calls: List[CallRecord] = []
         # key: 命令前缀或完整命令，value: 预设的 CommandResult
         self.stub_results: Dict[str, CommandResult] = {}
+        # key: 命令前缀或完整命令，value: 按调用顺序依次返回的结果（优先于 stub_results）
+        self.stub_sequence: Dict[str, Deque[CommandResult]] = defaultdict(deque)
+        # key: 命令前缀或完整命令，value: 调用时抛出的异常（优先于 stub_sequence / stub_results）
+        self.exception_for: Dict[str, BaseException] = {}
+    
+    def _record_cmd(self, cmd: List[str] | str) -> str:
+        """将命令规整为字符串"""
+        return cmd if isinstance(cmd, str) else " ".join(cmd)
+    
+    @staticmethod
+    def _match(table: Dict[str, Any], cmd_str: str) -> Any:
+        """按 精确匹配 → 最长前缀匹配 查找预设值
+
+        前缀匹配有意逐个扫描整张表：测试直接对 stub_results / stub_sequence /
+        exception_for 做 dict 赋值，维护按长度排序的索引需要拦截每次增删，
+        而每张表通常只有几条预设，全量扫描的开销可以忽略。
+        """
+        if cmd_str in table:
+            return table[cmd_str]
+        best: Optional[str] = None
+        for pattern in table:
+            if cmd_str.startswith(pattern) and (best is None or len(pattern) > len(best)):
+                best = pattern
+        return table[best] if best is not None else None
     
     def _find_stub(self, cmd_str: str) -> Optional[CommandResult]:
-        """查找匹配的预设结果（精确匹配 → 前缀匹配）"""
-        if cmd_str in self.stub_results:
-            return self.stub_results[cmd_str]
-        for pattern, result in self.stub_results.items():
-            if cmd_str.startswith(pattern):
-                return result
-        return None
+        """查找匹配的预设结果；命中 exception_for 时直接抛出预设异常"""
+        if self.exception_for:
+            exc = self._match(self.exception_for, cmd_str)
+            if exc is not None:
+                raise exc
+        if self.stub_sequence:
+            queue = self._match(self.stub_sequence, cmd_str)
+            if queue:
+                return queue.popleft()
+        return self._match(self.stub_results, cmd_str) if self.stub_results else None
     
     def run(
         self,
@@ -52,11 +87,14 @@ class MockRunner(ICommandRunner):
         shell: bool = False,
         capture_output: bool = True,
     ) -> CommandResult:
-        cmd_str = cmd if isinstance(cmd, str) else " ".join(cmd)
+        cmd_str = self._record_cmd(cmd)
         self.calls.append(CallRecord(
             cmd=cmd_str,
             cwd=cwd,
-            kwargs={"timeout": timeout, "check": check, "shell": shell, "capture_output": capture_output},
+            timeout=timeout,
+            check=check,
+            shell=shell,
+            capture_output=capture_output,
         ))
         
         stub = self._find_stub(cmd_str)
@@ -75,7 +113,7 @@ class MockRunner(ICommandRunner):
         cmd: List[str],
         cwd: Optional[Path] = None,
     ) -> int:
-        cmd_str = " ".join(cmd)
+        cmd_str = self._record_cmd(cmd)
         self.realtime_calls.append(CallRecord(cmd=cmd_str, cwd=cwd))
         
         stub = self._find_stub(cmd_str)
@@ -84,21 +122,31 @@ class MockRunner(ICommandRunner):
         return 0
     
     # ===== 测试辅助方法 =====
+    # 均直接读取 calls / realtime_calls，测试直接修改调用列表时断言结果与之一致
     
     def assert_called_with(self, substring: str) -> CallRecord:
         """断言至少有一次调用包含指定子串"""
-        for call in self.calls + self.realtime_calls:
+        for call in chain(self.calls, self.realtime_calls):
             if substring in call.cmd:
                 return call
-        all_cmds = [c.cmd for c in self.calls + self.realtime_calls]
         raise AssertionError(
             f"没有找到包含 '{substring}' 的调用。\n"
-            f"实际调用列表:\n" + "\n".join(f"  - {c}" for c in all_cmds)
+            f"实际调用列表:\n" + "\n".join(f"  - {c}" for c in self.all_commands)
         )
     
+    def assert_calls_with(self, *substrings: str) -> None:
+        """断言每个子串都至少出现在一次调用中（一次判定多个子串）"""
+        haystack = "\x00".join(self.all_commands)
+        missing = [s for s in substrings if s not in haystack]
+        if missing:
+            raise AssertionError(
+                f"没有找到包含 {missing} 的调用。\n"
+                f"实际调用列表:\n" + "\n".join(f"  - {c}" for c in self.all_commands)
+            )
+    
     def assert_not_called_with(self, substring: str) -> None:
         """断言没有调用包含指定子串"""
-        for call in self.calls + self.realtime_calls:
+        for call in chain(self.calls, self.realtime_calls):
             if substring in call.cmd:
                 raise AssertionError(
                     f"意外发现包含 '{substring}' 的调用: {call.cmd}"
@@ -107,15 +155,17 @@ class MockRunner(ICommandRunner):
     @property
     def all_commands(self) -> List[str]:
         """所有调用的命令列表"""
-        return [c.cmd for c in self.calls + self.realtime_calls]
+        return [c.cmd for c in chain(self.calls, self.realtime_calls)]
     
     def was_called_with_pattern(self, pattern: str) -> bool:
         """检查是否有调用匹配指定的正则表达式模式"""
-        import re
-        for call in self.calls + self.realtime_calls:
-            if re.search(pattern, call.cmd):
-                return True
-        return False
+        rx = re.compile(pattern)
+        return any(rx.search(call.cmd) for call in chain(self.calls, self.realtime_calls))
+
+
+def _state_key(key: Any) -> str:
+    """统一 StateKey 枚举与普通字符串"""
+    return getattr(key, "value", key)
 
 
 class MockStateManager(IStateManager):
@@ -125,26 +175,31 @@ class MockStateManager(IStateManager):
     使用 Set 跟踪已完成的 Key，无需文件系统。
     """
     
-    def __init__(self, pre_completed: Optional[Set[str]] = None):
-        self._completed: Set[str] = set()
-        if pre_completed:
-            for key in pre_completed:
-                k = key.value if hasattr(key, 'value') else key
-                self._completed.add(k)
+    def __init__(self, pre_completed: Optional[Iterable[str]] = None):
+        self._completed: Set[str] = (
+            set() if pre_completed is None else {_state_key(key) for key in pre_completed}
+        )
+        # completed_keys 的只读快照，状态变更时置空
+        self._snapshot: Optional[FrozenSet[str]] = None
     
     def is_completed(self, key: str) -> bool:
-        k = key.value if hasattr(key, 'value') else key
-        return k in self._completed
+        return _state_key(key) in self._completed
     
     def mark_completed(self, key: str) -> None:
-        k = key.value if hasattr(key, 'value') else key
-        self._completed.add(k)
+        k = _state_key(key)
+        if k not in self._completed:
+            self._completed.add(k)
+            self._snapshot = None
     
     def clear(self, key: str) -> None:
-        k = key.value if hasattr(key, 'value') else key
-        self._completed.discard(k)
+        k = _state_key(key)
+        if k in self._completed:
+            self._completed.discard(k)
+            self._snapshot = None
     
     @property
-    def completed_keys(self) -> Set[str]:
-        """所有已完成的 Key"""
-        return self._completed.copy()
+    def completed_keys(self) -> FrozenSet[str]:
+        """所有已完成的 Key（只读快照，状态未变时重复访问不再复制）"""
+        if self._snapshot is None:
+            self._snapshot = frozenset(self._completed)
+        return self._snapshot
@@ -1,8 +1,11 @@
 """
 Models Lock 单元测试
 
-覆盖 lock.py 的公开接口：scan_models / generate_snapshot / read_meta / write_meta / cleanup_orphan_metas
+覆盖 lock.py 的公开接口：scan_models / generate_snapshot / read_meta / write_meta / cleanup_orphan_metas，
+以及 GenerateSnapshotTask 对 manifest 中 full_hash_max_size 的读取
 """
+import hashlib
+import os
 import time
 from pathlib import Path
 from typing import Any, Dict
@@ -11,12 +14,17 @@ import pytest
 
 from src.addons.models.lock import (
     EXCLUDED_EXTENSIONS,
+    _meta_path_for,
     scan_models,
     generate_snapshot,
     read_meta,
     write_meta,
     cleanup_orphan_metas,
 )
+from src.addons.models.tasks import GenerateSnapshotTask
+from src.core.interface import AppContext
+from src.core.task import TaskResult
+from src.lib.utils import load_yaml
 
 
 # ── helpers ──────────────────────────────────────────────────
@@ -25,7 +33,12 @@ def _create_model(base: Path, rel_path: str, content: bytes = b"fake-model") ->
     """在 base 下创建模型文件并返回绝对路径"""
     p = base / rel_path
     p.parent.mkdir(parents=True, exist_ok=True)
-    p.write_bytes(content)
+    # 直接 os.write，省去 FileIO/BufferedWriter 的构造与 isatty/lseek
+    fd = os.open(p, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, content)
+    finally:
+        os.close(fd)
     return p
 
 
@@ -33,10 +46,26 @@ def _create_meta(base: Path, model_rel: str, meta: Dict[str, Any]) -> Path:
     """为模型文件创建 .meta sidecar"""
     model_path = base / model_rel
     write_meta(model_path, meta)
-    from src.addons.models.lock import _meta_path_for
     return _meta_path_for(model_path)
 
 
+@pytest.fixture(scope="module")
+def shared_models(tmp_path_factory) -> Path:
+    """模块内共享的只读模型目录（覆盖 TestScanModels 只读用例所需的全部文件）
+
+    会修改目录的用例请继续使用各自的 tmp_path。
+    """
+    models = tmp_path_factory.mktemp("shared") / "models"
+    _create_model(models, "unet/flux.safetensors", b"A" * 100)
+    _create_model(models, "clip/clip_l.safetensors", b"B" * 50)
+    _create_model(models, "standalone.ckpt")
+    _create_model(models, "unet/model.gguf")
+    _create_model(models, "unet/model.onnx")
+    _create_model(models, "unet/.hidden_model.safetensors")
+    _create_model(models, "unet/visible.safetensors")
+    return models
+
+
 # ── scan_models ──────────────────────────────────────────────
 
 class TestScanModels:
@@ -52,56 +81,39 @@ class TestScanModels:
         """不存在的目录返回空列表"""
         assert scan_models(tmp_path / "no_such_dir") == []
 
-    def test_scans_model_files_with_type(self, tmp_path: Path):
+    def test_scans_model_files_with_type(self, shared_models: Path):
         """正常扫描：返回 path/size/type，type 为第一层子目录"""
-        models = tmp_path / "models"
-        _create_model(models, "unet/flux.safetensors", b"A" * 100)
-        _create_model(models, "clip/clip_l.safetensors", b"B" * 50)
+        by_path = {r["path"]: r for r in scan_models(shared_models)}
 
-        result = scan_models(models)
-        paths = {r["path"] for r in result}
-
-        assert paths == {"unet/flux.safetensors", "clip/clip_l.safetensors"}
+        assert {"unet/flux.safetensors", "clip/clip_l.safetensors"} <= by_path.keys()
         # type = 第一层目录名
-        by_path = {r["path"]: r for r in result}
         assert by_path["unet/flux.safetensors"]["type"] == "unet"
+        assert by_path["clip/clip_l.safetensors"]["type"] == "clip"
         assert by_path["unet/flux.safetensors"]["size"] == 100
 
-    def test_root_level_file_has_no_type(self, tmp_path: Path):
+    def test_root_level_file_has_no_type(self, shared_models: Path):
         """根目录直接的文件 type 为 None"""
-        models = tmp_path / "models"
-        _create_model(models, "standalone.ckpt")
+        by_path = {r["path"]: r for r in scan_models(shared_models)}
+        assert by_path["standalone.ckpt"]["type"] is None
 
-        result = scan_models(models)
-        assert len(result) == 1
-        assert result[0]["type"] is None
-
-    @pytest.mark.parametrize("ext", [".yaml", ".json", ".txt", ".png", ".zip", ".meta", ".py"])
-    def test_excludes_non_model_extensions(self, tmp_path: Path, ext: str):
+    def test_excludes_non_model_extensions(self, tmp_path: Path):
         """排除列表中的扩展名不会被扫描"""
         models = tmp_path / "models"
-        _create_model(models, f"unet/file{ext}")
+        for ext in (".yaml", ".json", ".txt", ".png", ".zip", ".meta", ".py"):
+            _create_model(models, f"unet/file{ext}")
         assert scan_models(models) == []
 
-    def test_includes_unknown_extensions(self, tmp_path: Path):
+    def test_includes_unknown_extensions(self, shared_models: Path):
         """不在排除列表中的扩展名（如 .gguf .onnx）可被扫描"""
-        models = tmp_path / "models"
-        _create_model(models, "unet/model.gguf")
-        _create_model(models, "unet/model.onnx")
-
-        paths = {r["path"] for r in scan_models(models)}
+        paths = {r["path"] for r in scan_models(shared_models)}
         assert "unet/model.gguf" in paths
         assert "unet/model.onnx" in paths
 
-    def test_hidden_files_are_skipped(self, tmp_path: Path):
+    def test_hidden_files_are_skipped(self, shared_models: Path):
         """隐藏文件（.开头）被跳过"""
-        models = tmp_path / "models"
-        _create_model(models, "unet/.hidden_model.safetensors")
-        _create_model(models, "unet/visible.safetensors")
-
-        result = scan_models(models)
-        assert len(result) == 1
-        assert result[0]["path"] == "unet/visible.safetensors"
+        paths = {r["path"] for r in scan_models(shared_models)}
+        assert "unet/visible.safetensors" in paths
+        assert "unet/.hidden_model.safetensors" not in paths
 
     def test_merges_meta_sidecar(self, tmp_path: Path):
         """存在 .meta sidecar 时，合并 url/model/source 到扫描结果"""
@@ -175,6 +187,77 @@ class TestGenerateSnapshot:
 
         assert hash1 != hash2
 
+    def test_incremental_hash_recalc_on_inplace_replace(self, tmp_path: Path):
+        """同 size+mtime 但文件被替换（inode 变化）时，重新计算 hash"""
+        models = tmp_path / "models"
+        model_file = _create_model(models, "unet/model.safetensors", b"AAAA")
+        st = model_file.stat()
+
+        snap1 = generate_snapshot(models, {})
+        hash1 = snap1["models"][0]["hashes"][0]["hash"]
+
+        # 写入新文件后原子替换，并还原 mtime
+        replacement = _create_model(models, "unet/replacement.tmp", b"BBBB")
+        os.utime(replacement, ns=(st.st_atime_ns, st.st_mtime_ns))
+        os.replace(replacement, model_file)
+
+        snap2 = generate_snapshot(models, snap1)
+        hash2 = snap2["models"][0]["hashes"][0]["hash"]
+
+        assert hash1 != hash2
+
+    def test_parallel_hashes_match_files(self, tmp_path: Path):
+        """多个文件并行计算 hash 时，结果与各自文件一一对应"""
+        models = tmp_path / "models"
+        contents = {f"unet/m{i}.safetensors": bytes([i]) * (i + 1) for i in range(6)}
+        for rel, data in contents.items():
+            _create_model(models, rel, data)
+
+        snap = generate_snapshot(models, {})
+
+        by_path = {m["paths"][0]["path"]: m["hashes"][0]["hash"] for m in snap["models"]}
+        assert by_path == {
+            rel: hashlib.sha256(data).hexdigest() for rel, data in contents.items()
+        }
+
+    def test_default_records_full_sha256_for_large_files(self, tmp_path: Path):
+        """默认不启用首尾指纹：大文件同样记录全量 SHA256"""
+        models = tmp_path / "models"
+        chunk = 1 << 20
+        large = b"H" * chunk + b"M" * 16 + b"T" * chunk
+        _create_model(models, "unet/large.safetensors", large)
+
+        snap = generate_snapshot(models, {})
+
+        assert snap["models"][0]["hashes"] == [{
+            "hash": hashlib.sha256(large).hexdigest(),
+            "type": "SHA256",
+        }]
+
+    def test_head_tail_fingerprint_for_large_files(self, tmp_path: Path):
+        """显式配置阈值后，超过阈值的文件记录首尾指纹，阈值内的文件仍为全量 SHA256"""
+        models = tmp_path / "models"
+        chunk = 1 << 20
+        large = b"H" * chunk + b"M" * 16 + b"T" * chunk
+        _create_model(models, "unet/large.safetensors", large)
+        _create_model(models, "unet/small.safetensors", b"small")
+
+        snap = generate_snapshot(models, {}, full_hash_max_size=1024)
+
+        by_path = {m["paths"][0]["path"]: m["hashes"][0] for m in snap["models"]}
+        expected = hashlib.sha256(
+            large[:chunk] + large[-chunk:] + len(large).to_bytes(8, "little")
+        ).hexdigest()
+        assert by_path["unet/large.safetensors"] == {"hash": expected, "type": "SHA256-HEAD-TAIL"}
+        assert by_path["unet/small.safetensors"] == {
+            "hash": hashlib.sha256(b"small").hexdigest(),
+            "type": "SHA256",
+        }
+
+        # 复用时保留原 hash 类型
+        snap2 = generate_snapshot(models, snap, full_hash_max_size=1024)
+        assert snap2["models"] == snap["models"]
+
     def test_deleted_file_not_in_snapshot(self, tmp_path: Path):
         """删除文件后，快照不再包含该文件"""
         models = tmp_path / "models"
@@ -222,6 +305,18 @@ class TestMetaSidecar:
         assert loaded["url"] == meta["url"]
         assert loaded["source"] == meta["source"]
 
+    def test_overwrite_leaves_no_temp_file(self, tmp_path: Path):
+        """重复写入时覆盖旧内容，且不残留临时文件"""
+        model = _create_model(tmp_path, "vae/vae.safetensors")
+
+        write_meta(model, {"url": "old"})
+        write_meta(model, {"url": "new"})
+
+        assert read_meta(model) == {"url": "new"}
+        assert sorted(p.name for p in model.parent.iterdir()) == [
+            ".vae.safetensors.meta", "vae.safetensors",
+        ]
+
     def test_read_nonexistent_returns_empty(self, tmp_path: Path):
         """不存在 .meta 时返回空字典"""
         model = tmp_path / "clip" / "model.safetensors"
@@ -270,3 +365,28 @@ class TestCleanupOrphanMetas:
     def test_nonexistent_dir(self, tmp_path: Path):
         """目录不存在时返回 0"""
         assert cleanup_orphan_metas(tmp_path / "no_dir") == 0
+
+
+# ── GenerateSnapshotTask ─────────────────────────────────────
+
+class TestGenerateSnapshotTask:
+    """GenerateSnapshotTask 的首尾指纹开关"""
+
+    LARGE = b"L" * 4096
+
+    @pytest.mark.parametrize("manifest,expected_type", [
+        ({}, "SHA256"),
+        ({"full_hash_max_size": None}, "SHA256"),
+        ({"full_hash_max_size": 1024}, "SHA256-HEAD-TAIL"),
+    ], ids=["unset", "null", "opt_in"])
+    def test_full_hash_max_size_from_manifest(
+        self, app_context: AppContext, manifest: Dict[str, Any], expected_type: str,
+    ):
+        """未配置时记录全量 SHA256，仅在 manifest 显式配置阈值后记录首尾指纹"""
+        _create_model(app_context.base_dir / "models", "unet/large.safetensors", self.LARGE)
+        app_context.addon_manifests["models"] = manifest
+
+        assert GenerateSnapshotTask().execute(app_context) is TaskResult.SUCCESS
+
+        lock = load_yaml(app_context.base_dir / "model-lock.yaml")
+        assert lock["models"][0]["hashes"][0]["type"] == expected_type
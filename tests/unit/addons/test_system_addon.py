@@ -1,6 +1,6 @@
 """SystemAddon 单元测试"""
+import os
 from pathlib import Path
-from unittest.mock import patch
 
 import pytest
 
@@ -12,21 +12,16 @@ class TestSetup:
     """setup 钩子测试"""
 
     def test_fresh_install_success(
-        self, app_context: AppContext, mock_runner, tmp_path: Path, monkeypatch
+        self, app_context: AppContext, mock_runner, fake_home: Path, monkeypatch
     ):
         """全新安装：应安装 uv、生成 bin 脚本，设置 artifacts"""
-        # 设置 fake home
-        fake_home = tmp_path / "home"
-        fake_home.mkdir()
-        (fake_home / ".bashrc").touch()
         uv_path = fake_home / ".local" / "bin"
         uv_path.mkdir(parents=True)
         (uv_path / "uv").touch()
-        monkeypatch.setattr(Path, "home", lambda: fake_home)
 
-        with patch("shutil.which", return_value="/usr/bin/lsof"):
-            addon = SystemAddon()
-            addon.setup(app_context)
+        monkeypatch.setattr("shutil.which", lambda _: "/usr/bin/lsof")
+        addon = SystemAddon()
+        addon.setup(app_context)
 
         # 验证 artifacts
         assert app_context.artifacts.uv_bin == uv_path / "uv"
@@ -35,40 +30,63 @@ class TestSetup:
         assert expected_bin_dir.exists()
 
     def test_installs_uv_when_not_exists(
-        self, app_context: AppContext, mock_runner, tmp_path: Path, monkeypatch
+        self, app_context: AppContext, mock_runner, fake_home: Path, monkeypatch
     ):
         """uv 不存在时应执行安装"""
-        fake_home = tmp_path / "home"
-        fake_home.mkdir()
-        (fake_home / ".bashrc").touch()
-        monkeypatch.setattr(Path, "home", lambda: fake_home)
-
-        with patch("shutil.which", return_value="/usr/bin/lsof"):
-            addon = SystemAddon()
-            addon.setup(app_context)
+        monkeypatch.setattr("shutil.which", lambda _: "/usr/bin/lsof")
+        addon = SystemAddon()
+        addon.setup(app_context)
 
         # 验证调用了安装脚本
         assert mock_runner.was_called_with_pattern("curl.*uv/install.sh")
 
     def test_skips_uv_install_when_exists(
-        self, app_context: AppContext, mock_runner, tmp_path: Path, monkeypatch
+        self, app_context: AppContext, mock_runner, fake_home: Path, monkeypatch
     ):
         """uv 已存在时应跳过安装"""
-        fake_home = tmp_path / "home"
-        fake_home.mkdir()
-        (fake_home / ".bashrc").touch()
         uv_path = fake_home / ".local" / "bin"
         uv_path.mkdir(parents=True)
         (uv_path / "uv").touch()
-        monkeypatch.setattr(Path, "home", lambda: fake_home)
 
-        with patch("shutil.which", return_value="/usr/bin/lsof"):
-            addon = SystemAddon()
-            addon.setup(app_context)
+        monkeypatch.setattr("shutil.which", lambda _: "/usr/bin/lsof")
+        addon = SystemAddon()
+        addon.setup(app_context)
 
         # 验证未调用安装命令
         assert not mock_runner.was_called_with_pattern("curl")
 
+    def test_repeated_setup_does_not_duplicate_path(
+        self, app_context: AppContext, mock_runner, fake_home: Path, monkeypatch
+    ):
+        """重复 setup 时 PATH 中的 uv/bin 目录只出现一次"""
+        monkeypatch.setenv("PATH", "/usr/bin")
+
+        monkeypatch.setattr("shutil.which", lambda _: "/usr/bin/lsof")
+        addon = SystemAddon()
+        addon.setup(app_context)
+        addon.setup(app_context)
+
+        entries = os.environ["PATH"].split(os.pathsep)
+        assert entries.count(str(app_context.artifacts.bin_dir)) == 1
+        assert entries.count(str(fake_home / ".local" / "bin")) == 1
+        # .bashrc 只追加一次 PATH 配置
+        bashrc = (fake_home / ".bashrc").read_text()
+        assert bashrc.count(f'export PATH="{app_context.artifacts.bin_dir}:$PATH"') == 1
+
+    def test_existing_path_entry_moves_to_front(
+        self, app_context: AppContext, mock_runner, fake_home: Path, monkeypatch
+    ):
+        """PATH 中已有 bin 目录但排在后面时，setup 后将其移到最前"""
+        bin_dir = app_context.base_dir / "autodl-instance" / "bin"
+        monkeypatch.setenv("PATH", os.pathsep.join(["/usr/bin", str(bin_dir)]))
+
+        monkeypatch.setattr("shutil.which", lambda _: "/usr/bin/lsof")
+        SystemAddon().setup(app_context)
+
+        entries = os.environ["PATH"].split(os.pathsep)
+        assert entries[0] == str(bin_dir)
+        assert entries.count(str(bin_dir)) == 1
+
 
 class TestStart:
     """start 钩子测试"""
@@ -6,24 +6,30 @@ from unittest.mock import patch
 import pytest
 
 from src.addons.torch_engine.plugin import TorchAddon
+from src.addons.torch_engine.probe import TorchInfo, probe_torch_cuda, read_nvidia_driver_version
 from src.core.interface import AppContext
+from src.main import execute
 from src.core.ports import CommandResult
 
 
+_PY_CMD = f"{sys.executable} -c"
+
+
+def _cr(rc: int = 0, out: str = "", err: str = "", cmd: str = _PY_CMD) -> CommandResult:
+    """构造预设的 CommandResult（默认为探测脚本的成功结果）"""
+    return CommandResult(returncode=rc, stdout=out, stderr=err, command=cmd)
+
+
 class TestSetup:
     """setup 钩子测试"""
 
     def test_skip_when_cuda_ready(
-        self, app_context: AppContext, mock_runner
+        self, torch_addon: TorchAddon, app_context: AppContext, mock_runner
     ):
         """CUDA 已就绪时应跳过安装，设置 artifacts"""
-        mock_runner.stub_results[f"{sys.executable} -c"] = CommandResult(
-            returncode=0, stdout="torch=2.6.0, cuda_raw='13.0'", stderr="",
-            command=f"{sys.executable} -c",
-        )
+        mock_runner.stub_results[_PY_CMD] = _cr(out='{"torch": "2.6.0", "cuda": "13.0"}')
 
-        addon = TorchAddon()
-        addon.setup(app_context)
+        torch_addon.setup(app_context)
 
         # 不应调用安装命令
         mock_runner.assert_not_called_with("uv pip install")
@@ -31,45 +37,100 @@ class TestSetup:
         assert app_context.artifacts.torch_installed is True
 
     def test_installs_when_cuda_not_ready(
-        self, app_context: AppContext, mock_runner
+        self, torch_addon: TorchAddon, app_context: AppContext, mock_runner
     ):
         """CUDA 未就绪时应执行安装"""
         # 模拟 CUDA 未就绪
-        mock_runner.stub_results[f"{sys.executable} -c"] = CommandResult(
-            returncode=1, stdout="", stderr="", command=f"{sys.executable} -c",
-        )
+        mock_runner.stub_results[_PY_CMD] = _cr(1)
         # 模拟驱动版本满足要求
-        mock_runner.stub_results["nvidia-smi"] = CommandResult(
-            returncode=0, stdout="580.42.01", stderr="", command="nvidia-smi",
-        )
+        mock_runner.stub_results["nvidia-smi"] = _cr(out="580.42.01", cmd="nvidia-smi")
 
-        addon = TorchAddon()
-        addon.setup(app_context)
+        torch_addon.setup(app_context)
 
         # 应调用安装命令
         mock_runner.assert_called_with("uv pip install")
         assert app_context.artifacts.torch_installed is True
 
     def test_exits_when_driver_insufficient(
-        self, app_context: AppContext, mock_runner
+        self, torch_addon: TorchAddon, app_context: AppContext, mock_runner
     ):
         """驱动版本不足时应退出"""
-        mock_runner.stub_results[f"{sys.executable} -c"] = CommandResult(
-            returncode=1, stdout="", stderr="", command=f"{sys.executable} -c",
-        )
-        mock_runner.stub_results["nvidia-smi"] = CommandResult(
-            returncode=0, stdout="470.82.01", stderr="", command="nvidia-smi",
-        )
-
-        addon = TorchAddon()
+        mock_runner.stub_results[_PY_CMD] = _cr(1)
+        mock_runner.stub_results["nvidia-smi"] = _cr(out="470.82.01", cmd="nvidia-smi")
 
         with pytest.raises(SystemExit) as excinfo:
-            addon.setup(app_context)
+            torch_addon.setup(app_context)
 
         assert excinfo.value.code == 1
 
+    def test_raises_on_install_failure(
+        self, torch_addon: TorchAddon, app_context: AppContext, mock_runner
+    ):
+        """uv 安装失败时抛出 RuntimeError 并带上退出码"""
+        mock_runner.stub_results[_PY_CMD] = _cr(1)
+        mock_runner.stub_results["nvidia-smi"] = _cr(out="580.42.01", cmd="nvidia-smi")
+        mock_runner.stub_results["uv pip install"] = _cr(1, cmd="uv pip install")
+
+        with pytest.raises(RuntimeError, match=r"Torch 安装失败.*退出码:\s*1"):
+            torch_addon.setup(app_context)
+
+    def test_repeated_setup_is_idempotent(
+        self, torch_addon: TorchAddon, app_context: AppContext, mock_runner
+    ):
+        """重复 setup 复用探测缓存，不再启动解释器，也不触发安装"""
+        mock_runner.stub_results[_PY_CMD] = _cr(out='{"torch": "2.6.0", "cuda": "13.0"}')
+
+        torch_addon.setup(app_context)
+        torch_addon.setup(app_context)
+
+        # 就绪判断与调试信息共用一次子进程探测
+        assert len([c for c in mock_runner.calls if c.cmd.startswith(_PY_CMD)]) == 1
+        assert mock_runner.realtime_calls == []
+
+    def test_reprobes_after_install(
+        self, torch_addon: TorchAddon, app_context: AppContext, mock_runner
+    ):
+        """安装后探测缓存失效：下一次 setup 重新探测并识别为已就绪"""
+        mock_runner.stub_sequence[_PY_CMD].extend([
+            _cr(1),
+            _cr(out='{"torch": "2.9.0", "cuda": "13.0"}'),
+        ])
+        mock_runner.stub_results["nvidia-smi"] = _cr(out="580.42.01", cmd="nvidia-smi")
+
+        torch_addon.setup(app_context)
+        torch_addon.setup(app_context)
+
+        assert len(mock_runner.realtime_calls) == 1
+        assert mock_runner.realtime_calls[0].cmd.startswith("uv pip install")
+
+    @pytest.mark.parametrize("min_cuda,cuda,ready", [
+        (12.0, "13.0", True),
+        (13.0, "13.0", True),   # 恰好等于阈值
+        (13.1, "13.0", False),
+        (99.0, "13.0", False),
+        (13.0, "12.8", False),
+        (12.4, "12.10", True),  # 按整数比较 minor，不按 float
+    ])
+    def test_cuda_ready_threshold(
+        self, torch_addon: TorchAddon, app_context: AppContext, mock_runner, monkeypatch,
+        min_cuda: float, cuda: str, ready: bool,
+    ):
+        """CUDA 版本 >= min_cuda_version 时跳过安装，否则执行安装"""
+        app_context.addon_manifests["torch_engine"] = {"min_cuda_version": min_cuda}
+        monkeypatch.setattr(
+            "src.addons.torch_engine.plugin.probe_torch_cuda",
+            lambda: TorchInfo(version="2.9.0", cuda=cuda),
+        )
+        mock_runner.stub_results[_PY_CMD] = _cr(out=f'{{"torch": "2.9.0", "cuda": "{cuda}"}}')
+        mock_runner.stub_results["nvidia-smi"] = _cr(out="580.42.01", cmd="nvidia-smi")
+
+        torch_addon.setup(app_context)
+
+        assert (not mock_runner.realtime_calls) is ready
+        assert app_context.artifacts.torch_installed is True
+
     def test_reads_manifest_config(
-        self, app_context: AppContext, mock_runner
+        self, torch_addon: TorchAddon, app_context: AppContext, mock_runner
     ):
         """应从 manifest 读取配置"""
         app_context.addon_manifests["torch_engine"] = {
@@ -78,31 +139,171 @@ class TestSetup:
             "index_url": "https://custom.pytorch.org/whl",
             "packages": ["torch-custom"],
         }
-        mock_runner.stub_results[f"{sys.executable} -c"] = CommandResult(
-            returncode=0, stdout="", stderr="", command=f"{sys.executable} -c",
+        mock_runner.stub_results[_PY_CMD] = _cr()
+
+        torch_addon.setup(app_context)
+
+        assert torch_addon.min_driver == 600
+        assert torch_addon.min_cuda == 14.0
+        assert torch_addon.index_url == "https://custom.pytorch.org/whl"
+
+
+class TestInProcessProbe:
+    """进程内 Torch 探测测试"""
+
+    def test_reads_version_file_without_import(self, tmp_path: Path, monkeypatch):
+        """从 torch/version.py 解析版本与 CUDA，不执行 torch/__init__.py"""
+        pkg = tmp_path / "torch"
+        pkg.mkdir()
+        (pkg / "__init__.py").write_text("raise RuntimeError('should not import')\n")
+        (pkg / "version.py").write_text(
+            "from typing import Optional\n"
+            "__version__ = '2.9.0+cu130'\n"
+            "cuda: Optional[str] = '13.0'\n"
+        )
+        monkeypatch.syspath_prepend(str(tmp_path))
+
+        assert probe_torch_cuda() == TorchInfo(version="2.9.0+cu130", cuda="13.0")
+
+    def test_cpu_build_has_no_cuda(self, tmp_path: Path, monkeypatch):
+        """CPU 版 torch 的 cuda 为 None"""
+        pkg = tmp_path / "torch"
+        pkg.mkdir()
+        (pkg / "__init__.py").touch()
+        (pkg / "version.py").write_text("__version__ = '2.9.0+cpu'\ncuda = None\n")
+        monkeypatch.syspath_prepend(str(tmp_path))
+
+        info = probe_torch_cuda()
+        assert info == TorchInfo(version="2.9.0+cpu", cuda=None)
+        assert info.cuda_float is None
+
+    @pytest.mark.parametrize("import_result,ready", [
+        (_cr(out='{"torch": "2.9.0+cu130", "cuda": "13.0"}'), True),
+        # version.py 完好但 import torch 失败（残缺安装）
+        (_cr(1, err="ImportError: libcudnn.so.9: cannot open shared object file"), False),
+    ], ids=["import_ok", "broken_install"])
+    def test_ready_confirmed_by_import_subprocess(
+        self, torch_addon: TorchAddon, app_context: AppContext, mock_runner, monkeypatch,
+        import_result: CommandResult, ready: bool,
+    ):
+        """进程内预检通过后，仍由子进程 import torch 确认就绪，残缺安装会被重装"""
+        monkeypatch.setattr(
+            "src.addons.torch_engine.plugin.probe_torch_cuda",
+            lambda: TorchInfo(version="2.9.0+cu130", cuda="13.0"),
+        )
+        mock_runner.stub_results[_PY_CMD] = import_result
+        mock_runner.stub_results["nvidia-smi"] = _cr(out="580.42.01", cmd="nvidia-smi")
+
+        torch_addon.setup(app_context)
+
+        mock_runner.assert_called_with(_PY_CMD)
+        assert (not mock_runner.realtime_calls) is ready
+        assert app_context.artifacts.torch_installed is True
+
+    def test_cpu_build_installs_without_subprocess(
+        self, torch_addon: TorchAddon, app_context: AppContext, mock_runner, monkeypatch
+    ):
+        """已装 CPU 版 torch（cuda 为 None）时直接判定未就绪，不启动子解释器"""
+        monkeypatch.setattr(
+            "src.addons.torch_engine.plugin.probe_torch_cuda",
+            lambda: TorchInfo(version="2.9.0+cpu", cuda=None),
+        )
+        mock_runner.stub_results["nvidia-smi"] = _cr(out="580.42.01", cmd="nvidia-smi")
+
+        torch_addon.setup(app_context)
+
+        mock_runner.assert_not_called_with(_PY_CMD)
+        mock_runner.assert_called_with("uv pip install")
+
+
+class TestDriverProbe:
+    """NVIDIA 驱动版本探测测试"""
+
+    def test_reads_proc_driver_version(self, tmp_path: Path, monkeypatch):
+        """sysfs 不可读时回退解析 /proc/driver/nvidia/version"""
+        proc_file = tmp_path / "version"
+        proc_file.write_text(
+            "NVRM version: NVIDIA UNIX x86_64 Kernel Module  580.65.06  Sun Jul 27 2025\n"
+            "GCC version:  gcc version 12.3.0\n"
+        )
+        monkeypatch.setattr(
+            "src.addons.torch_engine.probe.NVIDIA_DRIVER_VERSION_FILES",
+            (tmp_path / "missing", proc_file),
+        )
+
+        assert read_nvidia_driver_version() == "580.65.06"
+
+    @pytest.mark.parametrize("stdout", ["  470.82.01  \n", "470.82.01\n580.42.01\n"])
+    def test_parses_padded_and_multi_gpu_output(
+        self, torch_addon: TorchAddon, app_context: AppContext, mock_runner, stdout: str
+    ):
+        """nvidia-smi 输出带空白或多卡多行时，取第一个版本号"""
+        mock_runner.stub_results[_PY_CMD] = _cr(1)
+        mock_runner.stub_results["nvidia-smi"] = _cr(out=stdout, cmd="nvidia-smi")
+
+        with pytest.raises(SystemExit):
+            torch_addon.setup(app_context)
+
+    def test_invalid_version_only_warns(
+        self, torch_addon: TorchAddon, app_context: AppContext, mock_runner
+    ):
+        """无法解析的驱动版本只告警，继续安装"""
+        mock_runner.stub_results[_PY_CMD] = _cr(1)
+        mock_runner.stub_results["nvidia-smi"] = _cr(out="N/A\n", cmd="nvidia-smi")
+
+        torch_addon.setup(app_context)
+
+        mock_runner.assert_called_with("uv pip install")
+
+    def test_skip_when_nvidia_smi_not_found(
+        self, torch_addon: TorchAddon, app_context: AppContext, mock_runner
+    ):
+        """无卡模式（nvidia-smi 不存在）跳过驱动校验，继续安装"""
+        mock_runner.stub_results[_PY_CMD] = _cr(1)
+        mock_runner.exception_for["nvidia-smi"] = FileNotFoundError("nvidia-smi")
+
+        torch_addon.setup(app_context)
+
+        mock_runner.assert_called_with("uv pip install")
+
+    def test_driver_file_skips_nvidia_smi(
+        self, torch_addon: TorchAddon, app_context: AppContext, mock_runner, monkeypatch
+    ):
+        """能读取驱动版本文件时不调用 nvidia-smi，版本不足仍退出"""
+        mock_runner.stub_results[_PY_CMD] = _cr(1)
+        monkeypatch.setattr(
+            "src.addons.torch_engine.plugin.read_nvidia_driver_version", lambda: "470.82.01"
         )
 
-        addon = TorchAddon()
-        addon.setup(app_context)
+        with pytest.raises(SystemExit):
+            torch_addon.setup(app_context)
+
+        mock_runner.assert_not_called_with("nvidia-smi")
+
+
+class TestModuleAttributes:
+    """插件标识属性测试"""
 
-        assert addon.min_driver == 600
-        assert addon.min_cuda == 14.0
-        assert addon.index_url == "https://custom.pytorch.org/whl"
+    def test_name_derived_from_module_dir(self):
+        """name 为类属性，与 module_dir 一致"""
+        assert TorchAddon.module_dir == "torch_engine"
+        assert TorchAddon.name == "torch_engine"
+        assert TorchAddon().name == "torch_engine"
 
 
 class TestStart:
     """start 钩子测试"""
 
-    def test_start_does_nothing(self, app_context: AppContext):
-        """start 为空实现"""
-        addon = TorchAddon()
-        addon.start(app_context)  # 不应抛出异常
+    def test_start_is_skipped(self, app_context: AppContext):
+        """无 start 逻辑：钩子为 None，pipeline 直接跳过"""
+        assert TorchAddon.start is None
+        execute("start", app_context, only="torch_engine")  # 不应抛出异常
 
 
 class TestSync:
     """sync 钩子测试"""
 
-    def test_sync_does_nothing(self, app_context: AppContext):
-        """sync 为空实现"""
-        addon = TorchAddon()
-        addon.sync(app_context)  # 不应抛出异常
+    def test_sync_is_skipped(self, app_context: AppContext):
+        """无 sync 逻辑：钩子为 None，pipeline 直接跳过"""
+        assert TorchAddon.sync is None
+        execute("sync", app_context, only="torch_engine")  # 不应抛出异常
@@ -4,122 +4,107 @@ DownloadManager 测试
 覆盖核心场景：策略选择逻辑、生命周期编排
 """
 import pytest
+from dataclasses import dataclass, field
 from pathlib import Path
-from unittest.mock import MagicMock, patch, call
+from typing import Any, List, Tuple
+from unittest.mock import patch
 
 from src.lib.download.manager import DownloadManager
-from src.lib.download.base import DownloadStrategy
+
+
+@dataclass
+class _StubStrategy:
+    """轻量策略替身：按顺序记录生命周期调用
+
+    替代 MagicMock(spec=DownloadStrategy)，避免每次构造都 inspect 整个抽象基类。
+    """
+    result: bool = True
+    name: str = "stub"
+    calls: List[Tuple[Any, ...]] = field(default_factory=list)
+
+    def pre_download(self, target_path: Path) -> None:
+        self.calls.append(("pre_download", target_path))
+
+    def download(self, url: str, target_path: Path, dry_run: bool = False) -> bool:
+        self.calls.append(("download", url, target_path, dry_run))
+        return self.result
+
+    def post_download(self, target_path: Path) -> None:
+        self.calls.append(("post_download", target_path))
+
+
+@pytest.fixture(scope="module")
+def manager() -> DownloadManager:
+    """整个模块共享一个 DownloadManager（策略在首次使用时实例化并缓存）"""
+    return DownloadManager()
 
 
 class TestStrategySelection:
     """策略选择逻辑测试 - 所有 URL 统一使用 aria2"""
-    
-    def test_all_urls_select_aria2(self):
-        """所有 URL 类型统一使用 aria2 策略"""
-        manager = DownloadManager()
-        
-        # 测试各种 URL 类型都返回 aria2 策略
-        urls = [
-            "https://huggingface.co/org/repo/resolve/main/model.safetensors",
-            "https://example.com/model.bin",
-            "https://civitai.com/api/download/models/12345",
-        ]
-        
-        for url in urls:
-            strategy = manager.get_strategy(url)
-            assert strategy.name == "aria2", f"URL {url} should use aria2 strategy"
-    
-    def test_direct_url_selects_aria2(self):
-        """直链 URL → 选择 aria2"""
-        manager = DownloadManager()
-        
-        with patch.object(manager._strategies["aria2"], 'is_available', return_value=True):
-            strategy = manager.get_strategy("https://example.com/model.bin")
-        
-        assert strategy.name == "aria2"
-    
-    def test_civitai_url_selects_aria2(self):
-        """CivitAI URL → 选择 aria2"""
+
+    def test_strategies_built_on_first_use(self):
+        """构造 DownloadManager 不实例化策略，首次选择时构造并复用"""
         manager = DownloadManager()
-        
-        with patch.object(manager._strategies["aria2"], 'is_available', return_value=True):
-            strategy = manager.get_strategy(
-                "https://civitai.com/api/download/models/12345"
-            )
-        
-        assert strategy.name == "aria2"
+        assert manager._strategies == {}
+
+        url = "https://example.com/model.bin"
+        strategy = manager.get_strategy(url)
+        assert manager.get_strategy(url) is strategy
+
+    @pytest.mark.parametrize("url", [
+        "https://huggingface.co/org/repo/resolve/main/model.safetensors",
+        "https://example.com/model.bin",
+        "https://civitai.com/api/download/models/12345",
+    ], ids=["huggingface", "direct", "civitai"])
+    def test_url_selects_aria2(self, manager: DownloadManager, url: str):
+        """所有 URL 类型统一使用 aria2 策略"""
+        assert manager.get_strategy(url).name == "aria2"
 
 
 class TestDownloadLifecycle:
     """下载生命周期编排测试"""
-    
-    def test_successful_download_lifecycle(self, tmp_path: Path):
-        """成功下载：pre_download → download → post_download"""
-        manager = DownloadManager()
-        target = tmp_path / "model.safetensors"
-        url = "https://example.com/model.safetensors"
-        
-        # 创建 mock 策略
-        mock_strategy = MagicMock(spec=DownloadStrategy)
-        mock_strategy.name = "mock"
-        mock_strategy.download.return_value = True
-        
-        with patch.object(manager, 'get_strategy', return_value=mock_strategy), \
-             patch.object(manager, '_ensure_tools'):
-            result = manager.download(url, target, dry_run=False)
-        
-        assert result is True
-        # 验证调用顺序
-        mock_strategy.pre_download.assert_called_once_with(target)
-        mock_strategy.download.assert_called_once_with(url, target, dry_run=False)
-        mock_strategy.post_download.assert_called_once_with(target)
-    
-    def test_failed_download_no_post_download(self, tmp_path: Path):
-        """下载失败时不调用 post_download"""
-        manager = DownloadManager()
-        target = tmp_path / "model.safetensors"
-        
-        mock_strategy = MagicMock(spec=DownloadStrategy)
-        mock_strategy.name = "mock"
-        mock_strategy.download.return_value = False
-        
-        with patch.object(manager, 'get_strategy', return_value=mock_strategy), \
-             patch.object(manager, '_ensure_tools'):
-            result = manager.download("https://example.com/model.bin", target)
-        
-        assert result is False
-        mock_strategy.post_download.assert_not_called()
-    
-    def test_dry_run_skips_lifecycle(self, tmp_path: Path):
-        """dry_run 模式跳过生命周期管理"""
-        manager = DownloadManager()
+
+    URL = "https://example.com/model.safetensors"
+
+    @pytest.mark.parametrize("result,dry_run,expected_phases", [
+        # 成功下载：pre_download → download → post_download
+        (True, False, ["pre_download", "download", "post_download"]),
+        # 下载失败时不调用 post_download
+        (False, False, ["pre_download", "download"]),
+        # dry_run 模式跳过生命周期管理
+        (True, True, ["download"]),
+    ], ids=["success", "failure", "dry_run"])
+    def test_download_lifecycle(
+        self, manager: DownloadManager, tmp_path: Path,
+        result: bool, dry_run: bool, expected_phases: List[str],
+    ):
+        """生命周期钩子按顺序调用，返回值透传 download 结果"""
         target = tmp_path / "model.safetensors"
-        
-        mock_strategy = MagicMock(spec=DownloadStrategy)
-        mock_strategy.name = "mock"
-        mock_strategy.download.return_value = True
-        
-        with patch.object(manager, 'get_strategy', return_value=mock_strategy), \
+        strategy = _StubStrategy(result=result)
+
+        with patch.object(manager, 'get_strategy', return_value=strategy), \
              patch.object(manager, '_ensure_tools'):
-            manager.download("https://example.com/model.bin", target, dry_run=True)
-        
-        mock_strategy.pre_download.assert_not_called()
-        mock_strategy.post_download.assert_not_called()
+            assert manager.download(self.URL, target, dry_run=dry_run) is result
+
+        records = {
+            "pre_download": ("pre_download", target),
+            "download": ("download", self.URL, target, dry_run),
+            "post_download": ("post_download", target),
+        }
+        # 一次列表比较同时校验调用参数与顺序
+        assert strategy.calls == [records[phase] for phase in expected_phases]
 
 
 class TestCacheAggregation:
     """缓存聚合测试"""
-    
-    def test_cache_info_returns_aria2_entries(self):
+
+    def test_cache_info_returns_aria2_entries(self, manager: DownloadManager):
         """cache_info 返回 Aria2 缓存条目
-        
+
         aria2 不产生持久化缓存目录，返回空列表
         """
-        manager = DownloadManager()
-        
-        # 调用实际的 cache_info
         entries = manager.cache_info()
-        
+
         # aria2 无持久化缓存，返回空列表
         assert isinstance(entries, list)
         assert len(entries) == 0
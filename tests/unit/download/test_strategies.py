@@ -5,6 +5,7 @@
 """
 import pytest
 import shutil
+from dataclasses import fields
 from pathlib import Path
 from unittest.mock import patch, MagicMock
 
@@ -12,51 +13,56 @@ from src.lib.download.aria2 import Aria2Strategy
 from src.lib.download.base import CacheEntry
 
 
+@pytest.fixture(scope="module")
+def strategy() -> Aria2Strategy:
+    """整个模块共享一个 Aria2Strategy（构造时读取 manifest.yaml，实例无可变状态）"""
+    return Aria2Strategy()
+
+
 class TestAria2Strategy:
     """Aria2 策略测试"""
     
-    def test_name_property(self):
+    def test_name_property(self, strategy: Aria2Strategy):
         """策略名称正确"""
-        strategy = Aria2Strategy()
         assert strategy.name == "aria2"
     
-    def test_is_available_when_aria2c_exists(self):
-        """aria2c 可执行时可用"""
-        strategy = Aria2Strategy()
+    @pytest.mark.parametrize("which,expected", [
+        ("/usr/bin/aria2c", True),
+        (None, False),
+    ], ids=["exists", "missing"])
+    def test_is_available_probes_path_once(
+        self, strategy: Aria2Strategy, monkeypatch, which, expected: bool
+    ):
+        """aria2c 在 PATH 中时可用，探测结果缓存在实例上"""
+        monkeypatch.setattr(strategy, "_available", None)
         
-        with patch.object(shutil, 'which', return_value='/usr/bin/aria2c'):
-            assert strategy.is_available() is True
-    
-    def test_is_available_when_aria2c_missing(self):
-        """aria2c 不存在时不可用"""
-        strategy = Aria2Strategy()
+        with patch.object(shutil, 'which', return_value=which) as mock_which:
+            assert strategy.is_available() is expected
+            assert strategy.is_available() is expected
         
-        with patch.object(shutil, 'which', return_value=None):
-            assert strategy.is_available() is False
+        mock_which.assert_called_once_with("aria2c")
     
-    def test_cache_info_returns_correct_structure(self):
+    def test_cache_info_returns_correct_structure(self, strategy: Aria2Strategy):
         """cache_info 返回正确结构
         
         aria2 不产生持久化缓存目录，cache_info 返回空列表
         """
-        strategy = Aria2Strategy()
         entries = strategy.cache_info()
         
         assert isinstance(entries, list)
         assert len(entries) == 0  # aria2 无持久化缓存
     
-    def test_pre_download_creates_parent_dir(self, tmp_path: Path):
+    def test_pre_download_creates_parent_dir(self, strategy: Aria2Strategy, tmp_path: Path):
         """pre_download 创建父目录"""
-        strategy = Aria2Strategy()
         target = tmp_path / "subdir" / "model.bin"
         
-        assert not target.parent.exists()
         strategy.pre_download(target)
-        assert target.parent.exists()
+        
+        # tmp_path 每个测试全新，无需先断言目录不存在
+        assert target.parent.is_dir()
     
-    def test_post_download_cleans_aria2_control_file(self, tmp_path: Path):
+    def test_post_download_cleans_aria2_control_file(self, strategy: Aria2Strategy, tmp_path: Path):
         """post_download 清理 .aria2 控制文件"""
-        strategy = Aria2Strategy()
         target = tmp_path / "model.bin"
         control_file = tmp_path / "model.bin.aria2"
         
@@ -67,3 +73,20 @@ class TestAria2Strategy:
         strategy.post_download(target)
         
         assert not control_file.exists()
+    
+    def test_post_download_without_control_file(self, strategy: Aria2Strategy, tmp_path: Path):
+        """没有 .aria2 控制文件时 post_download 静默跳过"""
+        target = tmp_path / "model.bin"
+        target.touch()
+        
+        strategy.post_download(target)
+        
+        assert target.exists()
+
+
+class TestCacheEntry:
+    """缓存条目结构测试"""
+    
+    def test_fields(self):
+        """CacheEntry 字段静态可知，无需调用 cache_info() 构造实例来检查结构"""
+        assert {f.name for f in fields(CacheEntry)} == {"name", "path", "size_bytes", "exists"}
@@ -14,32 +14,30 @@ from src.lib.download.url_utils import (
 class TestDetectUrlType:
     """URL 类型检测测试"""
     
-    def test_url_type_detection(self):
+    @pytest.mark.parametrize("url,expected", [
+        ("https://huggingface.co/org/repo/resolve/main/file.bin", "huggingface"),
+        ("https://huggingface.co/datasets/org/repo/resolve/main/data.parquet", "huggingface"),
+        ("https://civitai.com/api/download/models/12345", "civitai"),
+        ("https://example.com/file.bin", "direct"),
+    ], ids=["hf-model", "hf-dataset", "civitai", "direct"])
+    def test_url_type_detection(self, url: str, expected: str):
         """各类型 URL 正确检测"""
-        assert detect_url_type("https://huggingface.co/org/repo/resolve/main/file.bin") == "huggingface"
-        assert detect_url_type("https://civitai.com/api/download/models/12345") == "civitai"
-        assert detect_url_type("https://example.com/file.bin") == "direct"
+        assert detect_url_type(url) == expected
 
 
 class TestExtractFilenameFromUrl:
     """URL 文件名提取测试"""
     
-    def test_huggingface_url(self):
-        """从 HuggingFace URL 提取文件名"""
-        url = "https://huggingface.co/org/repo/resolve/main/model.safetensors"
-        assert extract_filename_from_url(url) == "model.safetensors"
-    
-    def test_direct_url(self):
-        """从直链 URL 提取文件名"""
-        url = "https://example.com/path/to/model.ckpt"
-        assert extract_filename_from_url(url) == "model.ckpt"
-    
-    def test_civitai_url_returns_empty(self):
-        """CivitAI 下载 URL 返回空（无文件名）"""
-        url = "https://civitai.com/api/download/models/12345"
-        assert extract_filename_from_url(url) == ""
-    
-    def test_url_without_extension_returns_empty(self):
-        """无扩展名的路径返回空"""
-        url = "https://example.com/path/to/file"
-        assert extract_filename_from_url(url) == ""
\ No newline at end of file
+    @pytest.mark.parametrize("url,expected", [
+        # HuggingFace URL
+        ("https://huggingface.co/org/repo/resolve/main/model.safetensors", "model.safetensors"),
+        # 直链 URL
+        ("https://example.com/path/to/model.ckpt", "model.ckpt"),
+        # CivitAI 下载 URL 无文件名
+        ("https://civitai.com/api/download/models/12345", ""),
+        # 无扩展名的路径
+        ("https://example.com/path/to/file", ""),
+    ], ids=["huggingface", "direct", "civitai-empty", "no-extension-empty"])
+    def test_extract_filename(self, url: str, expected: str):
+        """从 URL 提取文件名，无法识别时返回空字符串"""
+        assert extract_filename_from_url(url) == expected
@@ -0,0 +1,43 @@
+"""
+Artifacts 持久化测试
+
+覆盖 save 原子替换后的文件权限
+"""
+import os
+import stat
+from pathlib import Path
+
+import pytest
+
+from src.core.artifacts import ARTIFACTS_FILENAME, Artifacts
+
+
+def _mode(path: Path) -> int:
+    return stat.S_IMODE(path.stat().st_mode)
+
+
+class TestSave:
+    """Artifacts.save 测试"""
+
+    def test_new_file_follows_umask(self, tmp_path: Path, monkeypatch):
+        """新建文件由内核按 umask 设置权限（而不是 0600），且 save 不切换进程 umask"""
+        old_umask = os.umask(0o022)
+        try:
+            with monkeypatch.context() as m:
+                m.setattr(os, "umask", lambda mask: pytest.fail("save 不应切换 umask"))
+                Artifacts().save(tmp_path)
+        finally:
+            os.umask(old_umask)
+
+        assert _mode(tmp_path / ARTIFACTS_FILENAME) == 0o644
+
+    def test_keeps_existing_file_mode(self, tmp_path: Path):
+        """覆盖已有文件时沿用其原有权限"""
+        file_path = tmp_path / ARTIFACTS_FILENAME
+        file_path.write_text("{}")
+        file_path.chmod(0o640)
+
+        Artifacts(comfy_dir=tmp_path).save(tmp_path)
+
+        assert _mode(file_path) == 0o640
+        assert Artifacts.load(tmp_path).comfy_dir == tmp_path
@@ -4,36 +4,47 @@ main.py 单元测试（精简版）
 测试覆盖:
 - load_manifests(): manifest.yaml 加载逻辑
 - create_context(): 应用上下文创建
+- needs_network(): 网络初始化判定
 - main(): CLI 入口
 """
+import logging
+
 import pytest
+from contextlib import ExitStack
 from pathlib import Path
-from unittest.mock import patch
+from typing import Any, Dict
+from unittest.mock import DEFAULT, patch
 
-from src.main import load_manifests, create_context, main, BASE_DIR
+from src.main import (
+    BASE_DIR, PIDFILE_RECLAIM_TIMEOUT, create_context, load_manifests, main, needs_network,
+)
 from src.core.interface import AppContext
 from src.core.adapters import SubprocessRunner
 
 
+@pytest.fixture(scope="session")
+def project_manifests(project_root: Path) -> Dict[str, Dict[str, Any]]:
+    """真实项目的 manifest.yaml 只在整个测试会话中解析一次"""
+    return load_manifests(project_root)
+
+
 class TestLoadManifests:
     """load_manifests() 测试"""
 
-    @pytest.fixture
-    def real_project_root(self) -> Path:
-        """返回真实项目根目录"""
-        return Path(__file__).resolve().parent.parent.parent
-
-    def test_loads_manifests_correctly(self, real_project_root: Path):
+    @pytest.mark.parametrize("key", [
+        # addon manifests
+        "torch_engine",
+        "system",
+        # lib manifests
+        "download",
+    ], ids=str)
+    def test_loads_manifest(self, project_manifests: Dict[str, Dict[str, Any]], key: str):
         """应正确加载 addon 和 lib 的 manifest.yaml"""
-        manifests = load_manifests(real_project_root)
-        
-        # 验证加载了 addon manifests
-        assert "torch_engine" in manifests
-        assert "system" in manifests
-        # 验证加载了 lib manifests
-        assert "download" in manifests
-        # key 不应包含路径分隔符
-        for key in manifests.keys():
+        assert key in project_manifests
+
+    def test_keys_are_plain_names(self, project_manifests: Dict[str, Dict[str, Any]]):
+        """key 不应包含路径分隔符"""
+        for key in project_manifests:
             assert "/" not in key and "\\" not in key
 
     def test_missing_directory_returns_empty(self, tmp_path: Path):
@@ -70,101 +81,173 @@ class TestLoadManifests:
         assert "no_manifest" not in manifests
 
 
+class _FakeFileStateManager:
+    """FileStateManager 替身：只记录 base_dir，不触碰文件系统"""
+
+    def __init__(self, base_dir: Path) -> None:
+        self._base_dir = base_dir
+
+
 class TestCreateContext:
     """create_context() 测试"""
 
-    @pytest.fixture
-    def mock_file_state_manager(self):
-        """Mock FileStateManager 避免文件系统操作"""
-        with patch("src.main.FileStateManager") as mock_cls:
-            mock_cls.return_value._base_dir = BASE_DIR
-            yield mock_cls
+    @pytest.fixture(autouse=True)
+    def fake_file_state_manager(self, monkeypatch) -> None:
+        """替换 FileStateManager，避免文件系统操作"""
+        monkeypatch.setattr("src.main.FileStateManager", _FakeFileStateManager)
 
-    def test_returns_valid_app_context(self, mock_file_state_manager):
+    def test_returns_valid_app_context(self):
         """应返回正确配置的 AppContext"""
-        with patch("src.main.load_manifests", return_value={"test": {}}):
-            ctx = create_context()
+        ctx = create_context(manifests={"test": {}})
         
         assert isinstance(ctx, AppContext)
         assert ctx.base_dir == BASE_DIR
         assert isinstance(ctx.cmd, SubprocessRunner)
+        assert ctx.state._base_dir == BASE_DIR
         assert ctx.addon_manifests == {"test": {}}
 
     @pytest.mark.parametrize("debug", [False, True])
-    def test_debug_flag_propagates(self, mock_file_state_manager, debug):
+    def test_debug_flag_propagates(self, debug):
         """debug 参数正确传递"""
-        with patch("src.main.load_manifests", return_value={}):
-            ctx = create_context(debug=debug)
+        ctx = create_context(debug=debug, manifests={})
         assert ctx.debug == debug
 
-    def test_manifests_are_loaded(self, mock_file_state_manager):
-        """addon_manifests 应已预加载"""
+    def test_manifests_are_loaded(self, monkeypatch):
+        """未注入 manifests 时从 project_root 扫描加载"""
         fake_manifests = {"torch_engine": {"key": "value"}}
-        with patch("src.main.load_manifests", return_value=fake_manifests):
-            ctx = create_context()
+        monkeypatch.setattr("src.main.load_manifests", lambda project_root: fake_manifests)
+        ctx = create_context()
         assert ctx.addon_manifests == fake_manifests
 
 
+class TestNeedsNetwork:
+    """needs_network() 测试"""
+
+    @pytest.mark.parametrize("action", ["setup", "start"])
+    def test_setup_and_start_always_need_network(self, app_context, action):
+        """setup/start 总是需要网络"""
+        assert needs_network(action, app_context) is True
+
+    def test_sync_without_remote_skips_network(self, app_context):
+        """未配置 userdata 远程仓库时 sync 不需要网络"""
+        assert needs_network("sync", app_context) is False
+
+    def test_sync_with_userdata_repo_needs_network(self, app_context):
+        """配置了 userdata 远程仓库时 sync 需要网络"""
+        app_context.addon_manifests["userdata"] = {"userdata_repo": "git@github.com:u/r.git"}
+        assert needs_network("sync", app_context) is True
+
+    def test_sync_only_other_addon_skips_network(self, app_context):
+        """--only 指定的插件无远程操作时不需要网络"""
+        app_context.addon_manifests["userdata"] = {"userdata_repo": "git@github.com:u/r.git"}
+        assert needs_network("sync", app_context, only="models") is False
+
+
+# execute() 关键字参数的默认值（未传 --until/--only/--jobs 时）
+_EXECUTE_DEFAULTS: Dict[str, Any] = {"until": None, "only": None, "jobs": 1}
+
+
+@pytest.fixture(scope="class")
+def _patched_main_dependencies():
+    """main() 的外部依赖：同一测试类共享一组 patch，只 start/stop 一次"""
+    with ExitStack() as stack:
+        yield {
+            name: stack.enter_context(patch(f"src.main.{name}"))
+            for name in (
+                "setup_logger",
+                "claim_pidfile",
+                "kill_process_by_name",
+                "setup_network",
+                "invalidate_network_cache",
+                "sync_proxy_config",
+                "create_context",
+                "execute",
+            )
+        }
+
+
 class TestMain:
     """main() CLI 入口测试"""
 
     @pytest.fixture
-    def mock_dependencies(self):
-        """Mock 所有外部依赖"""
-        with patch("src.main.setup_logger"), \
-             patch("src.main.kill_process_by_name"), \
-             patch("src.main.setup_network"), \
-             patch("src.main.create_context") as mock_ctx, \
-             patch("src.main.execute") as mock_exec:
-            yield {"create_context": mock_ctx, "execute": mock_exec}
-
-    @pytest.mark.parametrize("action", ["setup", "start", "sync"])
-    def test_valid_actions(self, mock_dependencies, monkeypatch, action):
-        """有效 action 正确传递给 execute"""
-        monkeypatch.setattr("sys.argv", ["main.py", action])
-        main()
-        assert mock_dependencies["execute"].call_args[0][0] == action
-
-    def test_invalid_action_rejected(self, mock_dependencies, monkeypatch):
-        """无效 action 被 argparse 拒绝"""
-        monkeypatch.setattr("sys.argv", ["main.py", "invalid"])
-        with pytest.raises(SystemExit) as exc_info:
-            main()
-        assert exc_info.value.code == 2
-
-    @pytest.mark.parametrize("args,expected", [
-        (["main.py", "setup"], False),
-        (["main.py", "setup", "--debug"], True),
+    def mock_dependencies(self, _patched_main_dependencies):
+        """Mock 所有外部依赖（每个测试前重置调用记录与返回值）"""
+        for mock in _patched_main_dependencies.values():
+            mock.reset_mock(return_value=True, side_effect=True)
+        _patched_main_dependencies["claim_pidfile"].return_value = None
+        return _patched_main_dependencies
+
+    @pytest.mark.parametrize("argv,action,debug,exec_kwargs", [
+        pytest.param(["setup"], "setup", False, _EXECUTE_DEFAULTS, id="setup"),
+        pytest.param(["start"], "start", False, _EXECUTE_DEFAULTS, id="start"),
+        pytest.param(["sync"], "sync", False, _EXECUTE_DEFAULTS, id="sync"),
+        pytest.param(["setup", "--debug"], "setup", True, _EXECUTE_DEFAULTS, id="setup-debug"),
+        pytest.param(["setup", "--until", "comfy_core"], "setup", False,
+                     {**_EXECUTE_DEFAULTS, "until": "comfy_core"}, id="setup-until"),
+        pytest.param(["setup", "--only", "system"], "setup", False,
+                     {**_EXECUTE_DEFAULTS, "only": "system"}, id="setup-only"),
+        pytest.param(["setup", "--jobs", "4"], "setup", False,
+                     {**_EXECUTE_DEFAULTS, "jobs": 4}, id="setup-jobs"),
+        # action 为 None 表示应被 argparse 拒绝
+        pytest.param(["invalid"], None, None, None, id="invalid-action"),
     ])
-    def test_debug_flag(self, mock_dependencies, monkeypatch, args, expected):
-        """--debug 参数正确传递"""
-        monkeypatch.setattr("sys.argv", args)
-        main()
-        assert mock_dependencies["create_context"].call_args[1]["debug"] == expected
-
-    def test_until_parameter(self, mock_dependencies, monkeypatch):
-        """--until 参数正确传递"""
-        monkeypatch.setattr("sys.argv", ["main.py", "setup", "--until", "comfy_core"])
-        main()
-        assert mock_dependencies["execute"].call_args[1]["until"] == "comfy_core"
-
-    def test_only_parameter(self, mock_dependencies, monkeypatch):
-        """--only 参数正确传递"""
-        monkeypatch.setattr("sys.argv", ["main.py", "setup", "--only", "system"])
-        main()
-        assert mock_dependencies["execute"].call_args[1]["only"] == "system"
-
-    def test_execution_order(self, monkeypatch):
-        """初始化顺序: logger → kill → network → context → execute"""
+    def test_cli_dispatch(self, mock_dependencies, argv, action, debug, exec_kwargs):
+        """CLI 参数正确传递给 create_context / execute，无效 action 被拒绝"""
+        if action is None:
+            with pytest.raises(SystemExit) as exc_info:
+                main(argv)
+            assert exc_info.value.code == 2
+            mock_dependencies["execute"].assert_not_called()
+            return
+        
+        main(argv)
+        
+        assert mock_dependencies["create_context"].call_args[1]["debug"] is debug
+        args, kwargs = mock_dependencies["execute"].call_args
+        assert args[0] == action
+        assert kwargs == exec_kwargs
+
+    def test_skips_kill_without_live_instance(self, mock_dependencies):
+        """pidfile 中没有存活实例时不扫描进程表"""
+        main(["start"])
+        mock_dependencies["kill_process_by_name"].assert_not_called()
+
+    def test_kills_when_previous_instance_alive(self, mock_dependencies):
+        """上一个实例仍存活时清理残留进程，之后等待其退出并重新接管 pidfile"""
+        mock_dependencies["claim_pidfile"].side_effect = [12345, None]
+        main(["start"])
+        mock_dependencies["kill_process_by_name"].assert_called_once()
+        assert mock_dependencies["claim_pidfile"].call_args.kwargs == {
+            "wait": PIDFILE_RECLAIM_TIMEOUT,
+        }
+
+    def test_warns_when_previous_instance_survives(self, mock_dependencies, caplog):
+        """清理后旧实例仍未退出时告警"""
+        mock_dependencies["claim_pidfile"].return_value = 12345
+        with caplog.at_level(logging.WARNING, logger="autodl_setup"):
+            main(["start"])
+        assert "PID 12345" in caplog.text
+
+    def test_execution_order(self):
+        """初始化顺序: logger → kill → context → network → execute"""
         call_order = []
+        markers = {
+            "setup_logger": "logger",
+            "kill_process_by_name": "kill",
+            "create_context": "context",
+            "setup_network": "network",
+            "execute": "execute",
+        }
         
-        with patch("src.main.setup_logger", side_effect=lambda *a, **kw: call_order.append("logger")), \
-             patch("src.main.kill_process_by_name", side_effect=lambda *a, **kw: call_order.append("kill")), \
-             patch("src.main.setup_network", side_effect=lambda: call_order.append("network")), \
-             patch("src.main.create_context", side_effect=lambda **kw: call_order.append("context")), \
-             patch("src.main.execute", side_effect=lambda *a, **kw: call_order.append("execute")):
-            
-            monkeypatch.setattr("sys.argv", ["main.py", "setup"])
-            main()
+        with patch.multiple(
+            "src.main",
+            claim_pidfile=DEFAULT,
+            invalidate_network_cache=DEFAULT,
+            **{name: DEFAULT for name in markers},
+        ) as mocks:
+            mocks["claim_pidfile"].return_value = 12345
+            for name, marker in markers.items():
+                mocks[name].side_effect = lambda *a, _m=marker, **kw: call_order.append(_m)
+            main(["setup"])
         
-        assert call_order == ["logger", "kill", "network", "context", "execute"]
\ No newline at end of file
+        assert call_order == ["logger", "kill", "context", "network", "execute"]
@@ -7,106 +7,154 @@ import pytest
 from pathlib import Path
 
 from src.core.ports import CommandResult
-from tests.mocks import MockRunner, MockStateManager
+from src.core.schema import StateKey
+from tests.mocks import CallRecord, MockRunner, MockStateManager
 
 
 class TestMockRunner:
-    """MockRunner 测试"""
-
-    def test_default_success(self):
-        runner = MockRunner()
-        result = runner.run(["echo", "hello"])
+    """MockRunner 测试（mock_runner 来自 tests/conftest.py，每个测试一个新实例）"""
+
+    @pytest.fixture
+    def stubbed_runner(self, mock_runner: MockRunner) -> MockRunner:
+        """预置 nvidia-smi / git / git clone 返回值的 MockRunner"""
+        for cmd, stdout in (("nvidia-smi", "CUDA 12.1"), ("git", "generic"), ("git clone", "clone")):
+            mock_runner.stub_results[cmd] = CommandResult(
+                returncode=0, stdout=stdout, stderr="", command=cmd
+            )
+        return mock_runner
+
+    def test_default_success(self, mock_runner: MockRunner):
+        result = mock_runner.run(["echo", "hello"])
         assert result.returncode == 0
         assert result.command == "echo hello"
 
-    def test_records_calls(self):
-        runner = MockRunner()
-        runner.run(["git", "status"])
-        runner.run(["pip", "install", "torch"])
-        assert len(runner.calls) == 2
-        assert runner.calls[0].cmd == "git status"
-        assert runner.calls[1].cmd == "pip install torch"
-
-    def test_stub_results(self):
-        runner = MockRunner()
-        runner.stub_results["nvidia-smi"] = CommandResult(
-            returncode=0,
-            stdout="CUDA 12.1",
-            stderr="",
-            command="nvidia-smi",
-        )
+    def test_records_calls(self, mock_runner: MockRunner):
+        mock_runner.run(["git", "status"])
+        mock_runner.run(["pip", "install", "torch"])
+        assert len(mock_runner.calls) == 2
+        assert mock_runner.calls[0].cmd == "git status"
+        assert mock_runner.calls[1].cmd == "pip install torch"
 
-        result = runner.run(["nvidia-smi"])
+    def test_stub_results(self, stubbed_runner: MockRunner):
+        result = stubbed_runner.run(["nvidia-smi"])
         assert result.stdout == "CUDA 12.1"
 
-    def test_prefix_matching(self):
-        runner = MockRunner()
-        runner.stub_results["git clone"] = CommandResult(
-            returncode=0, stdout="ok", stderr="", command="git clone"
+    def test_prefix_matching(self, stubbed_runner: MockRunner):
+        result = stubbed_runner.run(["git", "clone", "--depth", "1", "https://example.com"])
+        assert result.stdout == "clone"
+
+    def test_longest_prefix_wins(self, stubbed_runner: MockRunner):
+        assert stubbed_runner.run(["git", "clone", "https://example.com"]).stdout == "clone"
+        assert stubbed_runner.run(["git", "status"]).stdout == "generic"
+
+    def test_stub_sequence(self, mock_runner: MockRunner):
+        mock_runner.stub_sequence["probe"].extend([
+            CommandResult(returncode=1, stdout="", stderr="", command="probe"),
+            CommandResult(returncode=0, stdout="ok", stderr="", command="probe"),
+        ])
+        mock_runner.stub_results["probe"] = CommandResult(
+            returncode=0, stdout="fallback", stderr="", command="probe"
         )
 
-        result = runner.run(["git", "clone", "--depth", "1", "https://example.com"])
-        assert result.stdout == "ok"
+        assert mock_runner.run(["probe"]).returncode == 1
+        assert mock_runner.run(["probe", "--x"]).stdout == "ok"
+        # 序列用完后回落到 stub_results
+        assert mock_runner.run(["probe"]).stdout == "fallback"
+
+    def test_exception_for(self, mock_runner: MockRunner):
+        mock_runner.exception_for["nvidia-smi"] = FileNotFoundError("nvidia-smi")
 
-    def test_realtime_records(self):
-        runner = MockRunner()
-        rc = runner.run_realtime(["pip", "install", "torch"])
+        with pytest.raises(FileNotFoundError):
+            mock_runner.run(["nvidia-smi", "--query-gpu=driver_version"])
+        # 调用仍被记录
+        mock_runner.assert_called_with("nvidia-smi")
+
+    def test_realtime_records(self, mock_runner: MockRunner):
+        rc = mock_runner.run_realtime(["pip", "install", "torch"])
         assert rc == 0
-        assert len(runner.realtime_calls) == 1
+        assert len(mock_runner.realtime_calls) == 1
 
-    def test_assert_called_with(self):
-        runner = MockRunner()
-        runner.run(["git", "clone", "https://example.com"])
-        call = runner.assert_called_with("git clone")
+    def test_assert_called_with_returns_call(self, mock_runner: MockRunner):
+        mock_runner.run(["git", "clone", "https://example.com"])
+        call = mock_runner.assert_called_with("git clone")
         assert call.cmd == "git clone https://example.com"
 
-    def test_assert_called_with_fails(self):
-        runner = MockRunner()
-        runner.run(["git", "status"])
-        with pytest.raises(AssertionError, match="没有找到"):
-            runner.assert_called_with("pip install")
-
-    def test_assert_not_called_with(self):
-        runner = MockRunner()
-        runner.run(["git", "status"])
-        runner.assert_not_called_with("pip")
+    @pytest.mark.parametrize("recorded,method,probes,match", [
+        pytest.param([("run", ["git", "clone", "https://example.com"])],
+                     "assert_called_with", ["git clone"], None, id="called_with"),
+        pytest.param([("run", ["git", "status"])],
+                     "assert_called_with", ["pip install"], "没有找到", id="called_with-fails"),
+        pytest.param([("run", ["git", "config", "user.name", "foo"]),
+                      ("run_realtime", ["git", "config", "user.email", "bar"])],
+                     "assert_calls_with", ["user.name foo", "user.email bar"], None, id="calls_with"),
+        pytest.param([("run", ["git", "config", "user.name", "foo"])],
+                     "assert_calls_with", ["user.name", "safe.directory"], "safe.directory",
+                     id="calls_with-reports-missing"),
+        pytest.param([("run", ["git", "status"])],
+                     "assert_not_called_with", ["pip"], None, id="not_called_with"),
+        pytest.param([("run", ["pip", "install", "torch"])],
+                     "assert_not_called_with", ["pip"], "意外发现", id="not_called_with-fails"),
+    ])
+    def test_assertions(self, mock_runner: MockRunner, recorded, method, probes, match):
+        """assert_* 辅助方法：匹配时通过，否则抛出带说明的 AssertionError"""
+        for runner_method, cmd in recorded:
+            getattr(mock_runner, runner_method)(cmd)
+        
+        check = getattr(mock_runner, method)
+        if match is None:
+            check(*probes)
+        else:
+            with pytest.raises(AssertionError, match=match):
+                check(*probes)
+
+    def test_assert_calls_with_follows_calls(self, mock_runner: MockRunner):
+        """assert_calls_with 以当前 calls 为准，清空调用列表后不再命中"""
+        mock_runner.run(["git", "status"])
+        mock_runner.calls.clear()
+
+        with pytest.raises(AssertionError, match="git status"):
+            mock_runner.assert_calls_with("git status")
+
+    def test_assert_not_called_with_follows_calls(self, mock_runner: MockRunner):
+        """assert_not_called_with 以当前 calls 为准，直接追加的调用记录同样会命中"""
+        mock_runner.calls.append(CallRecord(cmd="pip install torch"))
 
-    def test_assert_not_called_with_fails(self):
-        runner = MockRunner()
-        runner.run(["pip", "install", "torch"])
         with pytest.raises(AssertionError, match="意外发现"):
-            runner.assert_not_called_with("pip")
+            mock_runner.assert_not_called_with("pip install")
+
+    def test_all_commands(self, mock_runner: MockRunner):
+        mock_runner.run(["cmd1"])
+        mock_runner.run_realtime(["cmd2"])
+        assert mock_runner.all_commands == ["cmd1", "cmd2"]
 
-    def test_all_commands(self):
-        runner = MockRunner()
-        runner.run(["cmd1"])
-        runner.run_realtime(["cmd2"])
-        assert runner.all_commands == ["cmd1", "cmd2"]
+    def test_cwd_recorded(self, mock_runner: MockRunner):
+        mock_runner.run(["ls"], cwd=Path("/tmp"))
+        assert mock_runner.calls[0].cwd == Path("/tmp")
 
-    def test_cwd_recorded(self):
-        runner = MockRunner()
-        runner.run(["ls"], cwd=Path("/tmp"))
-        assert runner.calls[0].cwd == Path("/tmp")
+    def test_run_options_recorded(self, mock_runner: MockRunner):
+        mock_runner.run("ls", timeout=5, check=False, shell=True)
+        call = mock_runner.calls[0]
+        assert call.timeout == 5
+        assert call.check is False
+        assert call.shell is True
+        assert call.capture_output is True
 
 
 class TestMockStateManager:
     """MockStateManager 测试"""
 
-    def test_initially_empty(self):
-        state = MockStateManager()
-        assert not state.is_completed("foo")
+    def test_initially_empty(self, mock_state: MockStateManager):
+        assert not mock_state.is_completed("foo")
 
-    def test_mark_and_check(self):
-        state = MockStateManager()
-        state.mark_completed("foo")
-        assert state.is_completed("foo")
-        assert not state.is_completed("bar")
+    def test_mark_and_check(self, mock_state: MockStateManager):
+        mock_state.mark_completed("foo")
+        assert mock_state.is_completed("foo")
+        assert not mock_state.is_completed("bar")
 
-    def test_clear(self):
-        state = MockStateManager()
-        state.mark_completed("foo")
-        state.clear("foo")
-        assert not state.is_completed("foo")
+    def test_clear(self, mock_state: MockStateManager):
+        mock_state.mark_completed("foo")
+        mock_state.clear("foo")
+        assert not mock_state.is_completed("foo")
 
     def test_pre_completed(self):
         state = MockStateManager(pre_completed={"foo", "bar"})
@@ -114,15 +162,32 @@ class TestMockStateManager:
         assert state.is_completed("bar")
         assert not state.is_completed("baz")
 
-    def test_enum_support(self):
+    def test_enum_support(self, mock_state: MockStateManager):
         """支持 Enum value"""
-        from src.core.schema import StateKey
-        state = MockStateManager()
-        state.mark_completed(StateKey.COMFY_INSTALLED)
-        assert state.is_completed(StateKey.COMFY_INSTALLED)
+        mock_state.mark_completed(StateKey.COMFY_INSTALLED)
+        assert mock_state.is_completed(StateKey.COMFY_INSTALLED)
+
+    def test_completed_keys(self, mock_state: MockStateManager):
+        mock_state.mark_completed("a")
+        mock_state.mark_completed("b")
+        assert mock_state.completed_keys == {"a", "b"}
+
+    def test_completed_keys_snapshot_refreshes(self, mock_state: MockStateManager):
+        mock_state.mark_completed("a")
+        snapshot = mock_state.completed_keys
+        assert mock_state.completed_keys is snapshot
+
+        mock_state.mark_completed("b")
+        assert snapshot == {"a"}
+        assert mock_state.completed_keys == {"a", "b"}
+
+        mock_state.clear("a")
+        assert mock_state.completed_keys == {"b"}
+
+    def test_completed_keys_snapshot_survives_noop_writes(self):
+        state = MockStateManager(pre_completed={"a"})
+        snapshot = state.completed_keys
 
-    def test_completed_keys(self):
-        state = MockStateManager()
         state.mark_completed("a")
-        state.mark_completed("b")
-        assert state.completed_keys == {"a", "b"}
+        state.clear("missing")
+        assert state.completed_keys is snapshot
@@ -7,20 +7,70 @@ Pipeline 执行流程测试
 - sync 逆序执行
 """
 import pytest
-from unittest.mock import MagicMock, patch
 from pathlib import Path
 
-from src.main import create_pipeline, execute
+from src.main import PIPELINE_DEPENDENCIES, create_pipeline, execute
 from src.core.interface import AppContext
 
 
+class _StubAddon:
+    """轻量插件替身：生命周期钩子被调用时把插件名追加到共享列表"""
+
+    __slots__ = ("name", "sink")
+
+    def __init__(self, name: str, sink: list):
+        self.name = name
+        self.sink = sink
+
+    def setup(self, ctx) -> None:
+        self.sink.append(self.name)
+
+    start = sync = setup
+
+
+class _ExitingAddon(_StubAddon):
+    """setup 时 sys.exit(1) 的插件替身"""
+
+    __slots__ = ()
+
+    def setup(self, ctx) -> None:
+        raise SystemExit(1)
+
+
+def _mock_pipeline(names, called: list) -> list:
+    """按名称构造插件替身列表，钩子被调用时记录到 called"""
+    return [_StubAddon(name, called) for name in names]
+
+
+@pytest.fixture
+def pipeline_factory(monkeypatch):
+    """按名称构造插件替身并替换 src.main.create_pipeline，返回 (addons, called)"""
+    def _make(names):
+        called: list = []
+        addons = _mock_pipeline(names, called)
+        monkeypatch.setattr("src.main.create_pipeline", lambda: addons)
+        return addons, called
+    return _make
+
+
+@pytest.fixture
+def ctx(app_context: AppContext, tmp_path: Path) -> AppContext:
+    """execute("setup") 结束时会持久化 artifacts 到 project_root，指向 tmp_path 避免写入仓库"""
+    app_context.project_root = tmp_path
+    return app_context
+
+
+@pytest.fixture(scope="module")
+def pipeline() -> list:
+    """真实插件实例列表（只读使用，整个模块构造一次）"""
+    return create_pipeline()
+
+
 class TestCreatePipeline:
     """create_pipeline 测试"""
 
-    def test_returns_correct_order(self):
+    def test_returns_correct_order(self, pipeline: list):
         """应返回 7 个插件，顺序正确"""
-        pipeline = create_pipeline()
-
         assert len(pipeline) == 7
 
         names = [p.name for p in pipeline]
@@ -34,9 +84,8 @@ class TestCreatePipeline:
             "models",
         ]
 
-    def test_all_have_name_property(self):
+    def test_all_have_name_property(self, pipeline: list):
         """每个插件都应有 name 属性"""
-        pipeline = create_pipeline()
         for addon in pipeline:
             assert hasattr(addon, "name")
             assert isinstance(addon.name, str)
@@ -46,92 +95,95 @@ class TestCreatePipeline:
 class TestExecute:
     """execute 函数测试"""
 
-    def test_setup_calls_all_plugins(self, app_context):
+    ALL = ["system", "git_config", "torch_engine", "comfy_core", "userdata", "nodes", "models"]
+
+    def test_setup_calls_all_plugins(self, ctx, pipeline_factory):
         """setup 应按顺序调用所有插件"""
-        ctx = app_context
-        called = []
+        _, called = pipeline_factory(self.ALL)
+        execute("setup", ctx)
+        assert called == self.ALL
+
+    def test_setup_persists_artifacts(self, ctx, pipeline_factory):
+        """setup 完成后 artifacts 持久化到 project_root"""
+        pipeline_factory(["system"])
+        execute("setup", ctx)
+        assert (ctx.project_root / ".artifacts.json").exists()
 
-        # Patch 所有插件的 setup 方法
-        with patch("src.main.create_pipeline") as mock_pipeline:
-            mock_addons = []
-            for name in ["system", "git_config", "torch_engine", "comfy_core", "userdata", "nodes", "models"]:
-                addon = MagicMock()
-                addon.name = name
-                addon.setup = MagicMock(side_effect=lambda ctx, n=name: called.append(n))
-                mock_addons.append(addon)
-            mock_pipeline.return_value = mock_addons
+    def test_sync_reverses_order(self, ctx, pipeline_factory):
+        """sync 应逆序执行"""
+        _, called = pipeline_factory(["system", "git_config", "comfy_core"])
+        execute("sync", ctx)
+        assert called == ["comfy_core", "git_config", "system"]
 
-            execute("setup", ctx)
+    def test_until_stops_at_target(self, ctx, pipeline_factory):
+        """--until 应在目标插件后停止"""
+        _, called = pipeline_factory(["system", "git_config", "torch_engine", "comfy_core"])
+        execute("setup", ctx, until="git_config")
+        assert called == ["system", "git_config"]
 
-        assert called == ["system", "git_config", "torch_engine", "comfy_core", "userdata", "nodes", "models"]
+    def test_only_runs_single_plugin(self, ctx, pipeline_factory):
+        """--only 应只执行指定插件"""
+        _, called = pipeline_factory(["system", "git_config", "comfy_core"])
+        execute("setup", ctx, only="git_config")
+        assert called == ["git_config"]
 
-    def test_sync_reverses_order(self, app_context):
-        """sync 应逆序执行"""
-        ctx = app_context
-        called = []
+    def test_only_with_unknown_plugin_exits(self, ctx, pipeline_factory):
+        """--only 指定未知插件应报错退出"""
+        pipeline_factory(["system", "git_config"])
 
-        with patch("src.main.create_pipeline") as mock_pipeline:
-            mock_addons = []
-            for name in ["system", "git_config", "comfy_core"]:
-                addon = MagicMock()
-                addon.name = name
-                addon.sync = MagicMock(side_effect=lambda ctx, n=name: called.append(n))
-                mock_addons.append(addon)
-            mock_pipeline.return_value = mock_addons
+        with pytest.raises(SystemExit) as exc_info:
+            execute("setup", ctx, only="unknown_plugin")
 
-            execute("sync", ctx)
+        assert exc_info.value.code == 1
 
-        assert called == ["comfy_core", "git_config", "system"]
 
-    def test_until_stops_at_target(self, app_context):
-        """--until 应在目标插件后停止"""
-        ctx = app_context
-        called = []
+class TestParallelExecute:
+    """execute(jobs>1) 按依赖 DAG 并行执行测试"""
 
-        with patch("src.main.create_pipeline") as mock_pipeline:
-            mock_addons = []
-            for name in ["system", "git_config", "torch_engine", "comfy_core"]:
-                addon = MagicMock()
-                addon.name = name
-                addon.setup = MagicMock(side_effect=lambda ctx, n=name: called.append(n))
-                mock_addons.append(addon)
-            mock_pipeline.return_value = mock_addons
+    NAMES = ["system", "git_config", "torch_engine", "comfy_core", "userdata", "nodes", "models"]
 
-            execute("setup", ctx, until="git_config")
+    def test_declared_order_satisfies_dependencies(self, pipeline: list):
+        """create_pipeline 的声明顺序应是依赖 DAG 的合法拓扑序"""
+        names = [p.name for p in pipeline]
+        assert set(PIPELINE_DEPENDENCIES) == set(names)
+        for name, deps in PIPELINE_DEPENDENCIES.items():
+            for dep in deps:
+                assert names.index(dep) < names.index(name)
 
-        assert called == ["system", "git_config"]
+    def test_parallel_respects_dependencies(self, ctx, pipeline_factory):
+        """并行执行时，每个插件都在其依赖之后执行"""
+        _, called = pipeline_factory(self.NAMES)
 
-    def test_only_runs_single_plugin(self, app_context):
-        """--only 应只执行指定插件"""
-        ctx = app_context
-        called = []
+        execute("setup", ctx, jobs=4)
 
-        with patch("src.main.create_pipeline") as mock_pipeline:
-            mock_addons = []
-            for name in ["system", "git_config", "comfy_core"]:
-                addon = MagicMock()
-                addon.name = name
-                addon.setup = MagicMock(side_effect=lambda ctx, n=name: called.append(n))
-                mock_addons.append(addon)
-            mock_pipeline.return_value = mock_addons
+        assert sorted(called) == sorted(self.NAMES)
+        for name, deps in PIPELINE_DEPENDENCIES.items():
+            for dep in deps:
+                assert called.index(dep) < called.index(name)
 
-            execute("setup", ctx, only="git_config")
+    def test_unlisted_addon_waits_for_preceding(self, ctx, pipeline_factory):
+        """未在 PIPELINE_DEPENDENCIES 登记的插件，等待其之前的全部插件执行完毕"""
+        names = ["system", "git_config", "unlisted", "torch_engine"]
+        _, called = pipeline_factory(names)
 
-        assert called == ["git_config"]
+        execute("setup", ctx, jobs=4)
 
-    def test_only_with_unknown_plugin_exits(self, app_context):
-        """--only 指定未知插件应报错退出"""
-        ctx = app_context
-
-        with patch("src.main.create_pipeline") as mock_pipeline:
-            mock_addons = []
-            for name in ["system", "git_config"]:
-                addon = MagicMock()
-                addon.name = name
-                mock_addons.append(addon)
-            mock_pipeline.return_value = mock_addons
-
-            with pytest.raises(SystemExit) as exc_info:
-                execute("setup", ctx, only="unknown_plugin")
-            
-            assert exc_info.value.code == 1
+        assert called.index("unlisted") > max(called.index("system"), called.index("git_config"))
+
+    def test_parallel_with_until(self, ctx, pipeline_factory):
+        """并行模式下 --until 同样截断 pipeline"""
+        _, called = pipeline_factory(self.NAMES)
+
+        execute("setup", ctx, until="comfy_core", jobs=4)
+
+        assert sorted(called) == sorted(["system", "git_config", "torch_engine", "comfy_core"])
+
+    def test_parallel_propagates_exit(self, ctx, pipeline_factory):
+        """插件在工作线程中 sys.exit 时，execute 应向上传播"""
+        addons, called = pipeline_factory(self.NAMES)
+        addons[2] = _ExitingAddon(self.NAMES[2], called)
+
+        with pytest.raises(SystemExit):
+            execute("setup", ctx, jobs=4)
+
+        assert "comfy_core" not in called
@@ -0,0 +1,60 @@
+"""
+core.utils 测试
+
+覆盖 claim_pidfile 的原子创建与旧实例接管逻辑
+"""
+import os
+from pathlib import Path
+
+import pytest
+
+from src.core.utils import claim_pidfile
+
+
+class TestClaimPidfile:
+    """claim_pidfile 测试"""
+
+    OTHER_PID = 999999
+
+    def test_creates_pidfile(self, tmp_path: Path):
+        """pidfile 不存在时创建并写入当前 PID"""
+        pid_file = tmp_path / "app.pid"
+
+        assert claim_pidfile(pid_file) is None
+        assert pid_file.read_text() == str(os.getpid())
+
+    @pytest.mark.parametrize("content,alive", [
+        (str(OTHER_PID), False),  # 记录的进程已退出
+        ("not-a-pid", True),      # 内容无法解析
+        (str(os.getpid()), True),  # 残留的是当前 PID
+    ], ids=["dead", "garbage", "own_pid"])
+    def test_replaces_stale_pidfile(
+        self, tmp_path: Path, monkeypatch, content: str, alive: bool,
+    ):
+        """pidfile 已失效时删除后重新创建"""
+        monkeypatch.setattr("src.core.utils._pid_alive", lambda pid: alive)
+        pid_file = tmp_path / "app.pid"
+        pid_file.write_text(content)
+
+        assert claim_pidfile(pid_file) is None
+        assert pid_file.read_text() == str(os.getpid())
+
+    def test_keeps_live_instance_pidfile(self, tmp_path: Path, monkeypatch):
+        """记录的进程仍存活时返回其 PID，且不覆盖 pidfile"""
+        monkeypatch.setattr("src.core.utils._pid_alive", lambda pid: True)
+        pid_file = tmp_path / "app.pid"
+        pid_file.write_text(str(self.OTHER_PID))
+
+        assert claim_pidfile(pid_file) == self.OTHER_PID
+        assert pid_file.read_text() == str(self.OTHER_PID)
+
+    def test_waits_for_live_instance_to_exit(self, tmp_path: Path, monkeypatch):
+        """wait > 0 时等待旧实例退出后接管 pidfile"""
+        alive = iter([True, True, False])
+        monkeypatch.setattr("src.core.utils._pid_alive", lambda pid: next(alive))
+        monkeypatch.setattr("src.core.utils.time.sleep", lambda _: None)
+        pid_file = tmp_path / "app.pid"
+        pid_file.write_text(str(self.OTHER_PID))
+
+        assert claim_pidfile(pid_file, wait=5.0) is None
+        assert pid_file.read_text() == str(os.getpid())